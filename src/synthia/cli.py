@@ -1,10 +1,13 @@
 from typing import Annotated, Optional
 
 import typer
-from communex._common import get_node_url
-from communex.client import CommuneClient
 from communex.compat.key import classic_load_key
 
+from synthia.validator.embedding_cache import (AsyncCachedEmbedder,
+                                               CachedEmbedder, EmbeddingCache)
+from synthia.validator.node_pool import NodePool
+from synthia.validator.similarity import (AsyncEmbedder, AsyncOpenAIEmbedder,
+                                          Embedder, OpenAISettings)
 from synthia.validator.text_validator import (ClaudeProviders, TextValidator,
                                               ValidatorSettings,
                                               get_synthia_netuid)
@@ -21,6 +24,41 @@ def provider_callback(value: str):
         )
     return value
 
+
+def embedder_callback(value: str):
+    value = value.lower()
+    allowed_embedders = ["openai", "local"]
+    if value not in allowed_embedders:
+        raise typer.BadParameter(
+            f"Invalid embedder. Allowed embedders are: {', '.join(allowed_embedders)}"
+        )
+    return value
+
+
+def get_embedder(
+    embedder: str,
+    settings: ValidatorSettings,
+    local_model: str | None = None,
+    embedding_threads: int | None = None,
+) -> Embedder | AsyncEmbedder:
+    cache = EmbeddingCache.from_settings(settings)
+    match embedder:
+        case "local":
+            # imported here so torch is only needed when it's used
+            from synthia.validator.local_embedder import LocalTransformerEmbedder
+            local_embedder = (
+                LocalTransformerEmbedder(local_model, num_threads=embedding_threads)
+                if local_model
+                else LocalTransformerEmbedder(num_threads=embedding_threads)
+            )
+            return CachedEmbedder(local_embedder, cache)
+        case _:
+            return AsyncCachedEmbedder(
+                AsyncOpenAIEmbedder(OpenAISettings()),  # type: ignore
+                cache,
+            )
+
+
 @app.command('serve-synthia')
 def serve(
     commune_key: Annotated[
@@ -33,19 +71,35 @@ def serve(
     provider: Optional[str] = typer.Option(
         default="anthropic", callback=provider_callback
     ),
+    embedder: str = typer.Option(
+        default="openai",
+        callback=embedder_callback,
+        help="Embedding backend used for scoring: `openai` or `local` (CPU, needs torch)",
+    ),
+    local_embedding_model: Optional[str] = typer.Option(
+        default=None, help="HuggingFace model used by the local embedder"
+    ),
+    embedding_threads: Optional[int] = typer.Option(
+        default=None, help="Torch threads used by the local embedder"
+    ),
 
     ):
     provider_enumerated = ClaudeProviders(provider)
     keypair = classic_load_key(commune_key) # type: ignore
     settings = ValidatorSettings() #type: ignore
-    c_client = CommuneClient(get_node_url())
-    synthia_uid = get_synthia_netuid(c_client)
+    node_pool = NodePool.from_settings(settings)
+    synthia_uid = node_pool.run(get_synthia_netuid)
+    validator_embedder = get_embedder(
+        embedder, settings, local_embedding_model, embedding_threads
+    )
     validator = TextValidator(
         keypair, 
         synthia_uid, 
-        c_client, 
+        node_pool.best(),
         call_timeout=call_timeout,
-        provider=provider_enumerated
+        provider=provider_enumerated,
+        embedder=validator_embedder,
+        node_pool=node_pool,
     )
     validator.validation_loop(settings)
 
@@ -1,16 +1,45 @@
+import asyncio
 from abc import ABC, abstractmethod
+from typing import Any
 
 from communex.module.module import Module, endpoint  # type: ignore
 from fastapi import HTTPException
 
+from .response_cache import ResponseCache
+from .single_flight import SingleFlight
+from .timings import GenerationTimings
+
 
 class BaseLLM(ABC, Module):
+    # set by the modules that cache their answers
+    response_cache: ResponseCache | None = None
+    # seconds kept from the validator deadline, for the answer to reach it
+    deadline_margin: float = 1.0
+
+    def __init__(self) -> None:
+        super().__init__()
+        # validators often ask the same prompt at the same time
+        self.single_flight: SingleFlight[str] = SingleFlight()
+        self.timings = GenerationTimings()
+
     @abstractmethod
     def prompt(
             self, user_prompt: str, system_prompt: str | None = None
             ) -> tuple[str | None, str]:
         ...
 
+    async def aprompt(
+            self, user_prompt: str, system_prompt: str | None = None
+            ) -> tuple[str | None, str]:
+        """Async version of `prompt`.
+
+        Falls back to running `prompt` in a worker thread. Modules with an
+        async upstream client override it, so a request in flight doesn't
+        hold a thread.
+        """
+        with self.timings.measure():
+            return await asyncio.to_thread(self.prompt, user_prompt, system_prompt)
+
     @property
     def max_tokens(self) -> int:
         ...
@@ -19,6 +48,10 @@ class BaseLLM(ABC, Module):
     def model(self) -> str:
         ...
 
+    @property
+    def temperature(self) -> float:
+        ...
+
     def get_context_prompt(self, max_tokens: int) -> str:
         prompt = (
             "You are a supreme polymath renowned for your ability to explain "
@@ -39,9 +72,50 @@ class BaseLLM(ABC, Module):
         return prompt
     
     @endpoint
-    def generate(self, prompt: str) -> dict[str, str]:
+    async def generate(
+        self, prompt: str, deadline: float | None = None
+    ) -> dict[str, str]:
+        """Answers the prompt.
+
+        Args:
+            prompt: The validator question.
+            deadline: Seconds the validator waits for the answer. The
+                generation is aborted once they run out, instead of paying
+                for an answer nobody reads.
+        """
+        key = ResponseCache.key(
+            prompt,
+            model=self.model,
+            temperature=self.temperature,
+            max_tokens=self.max_tokens,
+        )
+        if self.response_cache is not None:
+            cached = await self.response_cache.aget(key)
+            if cached is not None:
+                return {"answer": cached}
+        call = self.single_flight.do(key, lambda: self._generate(prompt, key))
+        if deadline is None:
+            return {"answer": await call}
+        budget = deadline - self.deadline_margin
+        if budget <= 0:
+            call.close()
+            raise HTTPException(
+                status_code=504, detail=f"Can't generate an answer in {deadline}s"
+            )
+        try:
+            # the upstream call is cancelled if no other request waits for it
+            answer = await asyncio.wait_for(call, budget)
+        except asyncio.TimeoutError as e:
+            raise HTTPException(
+                status_code=504, detail=f"Could not generate an answer in {deadline}s"
+            ) from e
+        return {"answer": answer}
+
+    async def _generate(self, prompt: str, key: str) -> str:
         try:
-            message = self.prompt(prompt, self.get_context_prompt(self.max_tokens))
+            message = await self.aprompt(
+                prompt, self.get_context_prompt(self.max_tokens)
+            )
         except Exception as e:
             status_code = getattr(e, 'status_code', 500)
             raise HTTPException(status_code=status_code, detail=str(e)) from e
@@ -50,8 +124,23 @@ class BaseLLM(ABC, Module):
             case None, explanation:
                 raise HTTPException(status_code=500, detail=explanation)
             case answer, _:
-                return {"answer": answer}
-            
+                if self.response_cache is not None:
+                    await self.response_cache.aput(key, answer)
+                return answer
+
     @endpoint
     def get_model(self):
-        return {"model": self.model}
\ No newline at end of file
+        return {"model": self.model}
+
+    def stats(self) -> dict[str, Any]:
+        stats: dict[str, Any] = {
+            "single_flight": self.single_flight.stats(),
+            "timings": self.timings.stats(),
+        }
+        if self.response_cache is not None:
+            stats["response_cache"] = self.response_cache.stats()
+        return stats
+
+    @endpoint
+    def get_stats(self) -> dict[str, Any]:
+        return self.stats()
\ No newline at end of file
@@ -6,6 +6,17 @@ class AnthropicSettings(BaseSettings):
     model: str = "claude-3-5-sonnet-20240620"
     max_tokens: int = 3000
     temperature: float = 0.5
+    # serve requests with the async client, instead of a thread per request
+    use_async: bool = True
+    # == Response cache ==
+    # seconds a generated answer is served from the cache, 0 disables it
+    response_cache_ttl: int = 6 * 60 * 60
+    # total size of the answers kept in memory
+    response_cache_max_bytes: int = 64 * 1024 * 1024
+    # optional SQLite file keeping the answers across restarts
+    response_cache_path: str = ""
+    # seconds kept from the validator deadlines, for the answer to reach them
+    deadline_margin: float = 1.0
 
     class Config:
         env_prefix = "ANTHROPIC_"
@@ -18,6 +29,25 @@ class OpenrouterSettings(BaseSettings):
     model: str = "anthropic/claude-3.5-sonnet"
     max_tokens: int = 3000
     temperature: float = 0.5
+    base_url: str = "https://openrouter.ai/api/v1"
+    # connections kept open to the API
+    pool_size: int = 100
+    # seconds, the read timeout applies between two chunks of the response
+    connect_timeout: float = 10
+    read_timeout: float = 120
+    # seconds an idle connection is kept open
+    keepalive_timeout: float = 60
+    # serve requests with the async client, instead of a thread per request
+    use_async: bool = True
+    # == Response cache ==
+    # seconds a generated answer is served from the cache, 0 disables it
+    response_cache_ttl: int = 6 * 60 * 60
+    # total size of the answers kept in memory
+    response_cache_max_bytes: int = 64 * 1024 * 1024
+    # optional SQLite file keeping the answers across restarts
+    response_cache_path: str = ""
+    # seconds kept from the validator deadlines, for the answer to reach them
+    deadline_margin: float = 1.0
 
     class Config:
         env_prefix = "OPENROUTER_"
@@ -1,13 +1,18 @@
 import json
 from typing import Any
 
+import aiohttp
 import requests
-from anthropic import Anthropic
+from requests.adapters import HTTPAdapter
+from anthropic import Anthropic, AsyncAnthropic
 from anthropic._types import NotGiven
 
 from ._config import (  # Import the AnthropicSettings class from config
     AnthropicSettings, OpenrouterSettings)
 from .BaseLLM import BaseLLM
+from .response_cache import ResponseCache
+from .timings import GenerationTimer
+from .upstream import UpstreamSession
 from synthia.utils import log
 
 
@@ -16,6 +21,9 @@ class AnthropicModule(BaseLLM):
         super().__init__()
         self.settings = settings or AnthropicSettings()  # type: ignore
         self.client = Anthropic(api_key=self.settings.api_key)
+        self.async_client = AsyncAnthropic(api_key=self.settings.api_key)
+        self.response_cache = ResponseCache.from_settings(self.settings)
+        self.deadline_margin = self.settings.deadline_margin
         self.system_prompt = (
             "You are a supreme polymath renowned for your ability to explain "
             "complex concepts effectively to any audience from laypeople "
@@ -33,21 +41,39 @@ class AnthropicModule(BaseLLM):
             f"Keep your answer below {int(self.settings.max_tokens * 0.75)} tokens"
         )
 
-    def prompt(self, user_prompt: str, system_prompt: str | None | NotGiven = None):
-        if not system_prompt:
-            system_prompt = self.system_prompt
-        message = self.client.messages.create(
-            model=self.settings.model,
-            max_tokens=self.settings.max_tokens,
-            temperature=self.settings.temperature,
-            system=system_prompt,
-            messages=[
+    def _request(
+        self, user_prompt: str, system_prompt: str | None | NotGiven
+    ) -> dict[str, Any]:
+        return {
+            "model": self.settings.model,
+            "max_tokens": self.settings.max_tokens,
+            "temperature": self.settings.temperature,
+            "system": system_prompt or self.system_prompt,
+            "messages": [
                 {"role": "user", "content": user_prompt},
             ],
+        }
+
+    def prompt(self, user_prompt: str, system_prompt: str | None | NotGiven = None):
+        message = self.client.messages.create(
+            **self._request(user_prompt, system_prompt)
         )
         treated_message = self._treat_response(message)
         return treated_message
 
+    async def aprompt(self, user_prompt: str, system_prompt: str | None = None):
+        if not self.settings.use_async:
+            return await super().aprompt(user_prompt, system_prompt)
+        # streamed, so an aborted generation closes the connection right away
+        with self.timings.measure() as timer:
+            async with self.async_client.messages.stream(
+                **self._request(user_prompt, system_prompt)
+            ) as stream:
+                async for _ in stream.text_stream:
+                    timer.token()
+                message = await stream.get_final_message()
+        return self._treat_response(message)
+
     def _treat_response(self, message: Any):
         # TODO: use result ADT
         message_dict = message.dict()
@@ -72,6 +98,10 @@ class AnthropicModule(BaseLLM):
     def model(self) -> str:
         return self.settings.model
 
+    @property
+    def temperature(self) -> float:
+        return self.settings.temperature
+
 
 class OpenrouterModule(BaseLLM):
 
@@ -90,6 +120,20 @@ class OpenrouterModule(BaseLLM):
             raise ValueError(
                 f"Model {self.settings.model} not supported on Openrouter"
             )
+        settings = self.settings
+        self.upstream = UpstreamSession(
+            pool_size=settings.pool_size,
+            connect_timeout=settings.connect_timeout,
+            read_timeout=settings.read_timeout,
+            keepalive_timeout=settings.keepalive_timeout,
+        )
+        # the sync fallback keeps its connections alive as well
+        self.sync_session = requests.Session()
+        adapter = HTTPAdapter(pool_maxsize=settings.pool_size)
+        self.sync_session.mount("https://", adapter)
+        self.sync_session.mount("http://", adapter)
+        self.response_cache = ResponseCache.from_settings(self.settings)
+        self.deadline_margin = self.settings.deadline_margin
 
     @property
     def max_tokens(self) -> int:
@@ -100,30 +144,89 @@ class OpenrouterModule(BaseLLM):
         model_name = self.module_name_mapping(self.settings.model)
         return model_name
 
+    @property
+    def temperature(self) -> float:
+        return self.settings.temperature
+
     def module_name_mapping(self, model_name: str) -> str:
         return self.module_map[model_name]
 
-    def prompt(self, user_prompt: str, system_prompt: str | None = None):
+    @property
+    def _url(self) -> str:
+        return f"{self.settings.base_url}/chat/completions"
+
+    def _headers(self) -> dict[str, str]:
+        return {"Authorization": f"Bearer {self.settings.api_key}"}
+
+    def _request(self, user_prompt: str, system_prompt: str | None) -> dict[str, Any]:
         context_prompt = system_prompt or self.get_context_prompt(
             self.max_tokens)
-        model = self.model
-        prompt = {
-            "model": model,
+        return {
+            "model": self.model,
             "messages": [
                 {"role": "system", "content": context_prompt},
                 {"role": "user", "content": user_prompt},
             ]
         }
-        key = self.settings.api_key
-        response = requests.post(
-            url="https://openrouter.ai/api/v1/chat/completions",
-            headers={
-                "Authorization": f"Bearer {key}",
-            },
-            data=json.dumps(prompt)
-        )
 
-        json_response: dict[Any, Any] = response.json()
+    def prompt(self, user_prompt: str, system_prompt: str | None = None):
+        prompt = self._request(user_prompt, system_prompt)
+        response = self.sync_session.post(
+            url=self._url,
+            headers=self._headers(),
+            data=json.dumps(prompt),
+            timeout=(self.settings.connect_timeout, self.settings.read_timeout),
+        )
+        return self._treat_response(response.json())
+
+    async def aprompt(self, user_prompt: str, system_prompt: str | None = None):
+        if not self.settings.use_async:
+            return await super().aprompt(user_prompt, system_prompt)
+        request = {**self._request(user_prompt, system_prompt), "stream": True}
+        # streamed, so an aborted generation closes the connection right away
+        with self.timings.measure() as timer:
+            async with self.upstream.get().post(
+                self._url, headers=self._headers(), json=request
+            ) as response:
+                if response.content_type != "text/event-stream":
+                    # errors, as running out of credits, aren't streamed
+                    return self._treat_response(
+                        await response.json(content_type=None)
+                    )
+                return await self._read_stream(response, timer)
+
+    async def _read_stream(
+        self, response: aiohttp.ClientResponse, timer: GenerationTimer
+    ) -> tuple[str | None, str]:
+        content: list[str] = []
+        finish_reason = None
+        async for line in response.content:
+            # server sent events, lines starting with a colon are keep-alives
+            if not line.startswith(b"data:"):
+                continue
+            data = line[len(b"data:"):].strip()
+            if data == b"[DONE]":
+                break
+            chunk = json.loads(data)
+            if "error" in chunk:
+                return self._treat_response(chunk)
+            choice = chunk["choices"][0]
+            delta = choice.get("delta", {}).get("content")
+            if delta:
+                timer.token()
+                content.append(delta)
+            finish_reason = choice.get("finish_reason") or finish_reason
+        return self._treat_response({
+            "choices": [{
+                "finish_reason": finish_reason,
+                "message": {"content": "".join(content)},
+            }]
+        })
+
+    def stats(self) -> dict[str, Any]:
+        return {**super().stats(), "upstream": self.upstream.stats()}
+
+    def _treat_response(self, json_response: dict[Any, Any]):
         error = json_response.get("error")
         if error is not None and error.get("code") == 402:
             message = "Insufficient credits"
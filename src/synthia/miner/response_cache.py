@@ -0,0 +1,195 @@
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any
+
+from synthia.utils import log
+
+from ._config import AnthropicSettings, OpenrouterSettings
+
+# puts between two size checks of the disk tier
+DISK_EVICTION_INTERVAL = 100
+
+
+def normalize_prompt(prompt: str) -> str:
+    """Collapses whitespace, so prompts differing only in spacing match."""
+    return " ".join(prompt.split())
+
+
+class ResponseCache:
+    """Cache of generated answers, keyed by prompt and generation settings.
+
+    Answers live for `ttl` seconds. The in-memory tier is an LRU bounded by
+    the total size of the cached answers, `max_bytes`. With `disk_path`,
+    answers are also written to a SQLite database, which is checked on
+    memory misses and survives restarts. It holds up to `disk_max_entries`
+    answers; past that the oldest ones are dropped first, regardless of
+    their use. `aget` and `aput` keep the database I/O off the event loop.
+    """
+
+    def __init__(
+        self,
+        max_bytes: int = 64 * 1024 * 1024,
+        ttl: float = 6 * 60 * 60,
+        disk_path: str | None = None,
+        disk_max_entries: int = 100_000,
+    ) -> None:
+        assert max_bytes >= 0 and ttl > 0
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.disk_max_entries = disk_max_entries
+        # key -> (answer, expiry time, size in bytes)
+        self._memory: OrderedDict[str, tuple[str, float, int]] = OrderedDict()
+        self._bytes = 0
+        # the sync generation path runs on a thread pool
+        self._lock = threading.Lock()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._puts = 0
+        self._db: sqlite3.Connection | None = None
+        if disk_path:
+            disk_path = os.path.expanduser(disk_path)
+            os.makedirs(os.path.dirname(os.path.abspath(disk_path)), exist_ok=True)
+            self._db = sqlite3.connect(disk_path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                " key TEXT PRIMARY KEY,"
+                " answer TEXT NOT NULL,"
+                " expires REAL NOT NULL)"
+            )
+            self._db.execute(
+                "CREATE INDEX IF NOT EXISTS responses_expires ON responses (expires)"
+            )
+            self._db.commit()
+
+    @classmethod
+    def from_settings(
+        cls, settings: AnthropicSettings | OpenrouterSettings
+    ) -> "ResponseCache | None":
+        """Builds the cache from miner settings, None if it's disabled."""
+        if not settings.response_cache_ttl:
+            return None
+        return cls(
+            max_bytes=settings.response_cache_max_bytes,
+            ttl=settings.response_cache_ttl,
+            disk_path=settings.response_cache_path or None,
+        )
+
+    @staticmethod
+    def key(prompt: str, **params: Any) -> str:
+        """Key of a prompt, generated with the given model settings."""
+        payload = json.dumps(
+            [normalize_prompt(prompt), params], sort_keys=True, default=str
+        )
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def get(self, key: str) -> str | None:
+        answer = self._get_memory(key)
+        if answer is None:
+            answer = self._get_disk(key)
+        return answer
+
+    async def aget(self, key: str) -> str | None:
+        answer = self._get_memory(key)
+        if answer is None:
+            answer = await asyncio.to_thread(self._get_disk, key)
+        return answer
+
+    def _get_memory(self, key: str) -> str | None:
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is None:
+                return None
+            answer, expires, size = entry
+            if expires > time.time():
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                return answer
+            del self._memory[key]
+            self._bytes -= size
+            return None
+
+    def _get_disk(self, key: str) -> str | None:
+        with self._lock:
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT answer, expires FROM responses WHERE key = ? AND expires > ?",
+                    (key, time.time()),
+                ).fetchone()
+                if row is not None:
+                    self.disk_hits += 1
+                    self._remember(key, row[0], row[1])
+                    return row[0]
+            self.misses += 1
+            return None
+
+    def put(self, key: str, answer: str) -> None:
+        expires = time.time() + self.ttl
+        with self._lock:
+            self._remember(key, answer, expires)
+        self._put_disk(key, answer, expires)
+
+    async def aput(self, key: str, answer: str) -> None:
+        expires = time.time() + self.ttl
+        with self._lock:
+            self._remember(key, answer, expires)
+        if self._db is not None:
+            await asyncio.to_thread(self._put_disk, key, answer, expires)
+
+    def _put_disk(self, key: str, answer: str, expires: float) -> None:
+        with self._lock:
+            if self._db is None:
+                return
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses (key, answer, expires) VALUES (?, ?, ?)",
+                (key, answer, expires),
+            )
+            self._puts += 1
+            if self._puts % DISK_EVICTION_INTERVAL == 0:
+                self._evict_disk()
+            self._db.commit()
+
+    def _remember(self, key: str, answer: str, expires: float) -> None:
+        size = len(answer.encode())
+        if size > self.max_bytes:
+            return
+        previous = self._memory.pop(key, None)
+        if previous is not None:
+            self._bytes -= previous[2]
+        self._memory[key] = (answer, expires, size)
+        self._bytes += size
+        while self._bytes > self.max_bytes:
+            _, (_, _, evicted_size) = self._memory.popitem(last=False)
+            self._bytes -= evicted_size
+            self.evictions += 1
+
+    def _evict_disk(self) -> None:
+        assert self._db is not None
+        self._db.execute("DELETE FROM responses WHERE expires <= ?", (time.time(),))
+        (count,) = self._db.execute("SELECT COUNT(*) FROM responses").fetchone()
+        if count > self.disk_max_entries:
+            # the ones expiring first are the oldest
+            self._db.execute(
+                "DELETE FROM responses WHERE key IN ("
+                " SELECT key FROM responses ORDER BY expires LIMIT ?)",
+                (count - self.disk_max_entries,),
+            )
+            log(f"Evicted {count - self.disk_max_entries} cached responses from disk")
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "entries": len(self._memory),
+            "bytes": self._bytes,
+        }
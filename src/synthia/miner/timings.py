@@ -0,0 +1,79 @@
+import asyncio
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Generator
+
+
+class GenerationTimer:
+    """Times a single generation, from the request to its last token."""
+
+    def __init__(self) -> None:
+        self.start = time.perf_counter()
+        self.first_token: float | None = None
+        self.tokens = 0
+
+    def token(self) -> None:
+        """Marks a chunk of the answer as received."""
+        if self.first_token is None:
+            self.first_token = time.perf_counter()
+        self.tokens += 1
+
+    @property
+    def ttft(self) -> float | None:
+        if self.first_token is None:
+            return None
+        return self.first_token - self.start
+
+
+class GenerationTimings:
+    """Time to first token and total time of the recent generations.
+
+    Generations that are cancelled, usually because their deadline passed,
+    count as aborted; ones raising any other error count as failed.
+
+    Args:
+        history: Amount of recent generations the percentiles are taken from.
+    """
+
+    def __init__(self, history: int = 1000) -> None:
+        self._ttfts: deque[float] = deque(maxlen=history)
+        self._totals: deque[float] = deque(maxlen=history)
+        self.completed = 0
+        self.aborted = 0
+        self.failed = 0
+
+    @contextmanager
+    def measure(self) -> Generator[GenerationTimer, None, None]:
+        timer = GenerationTimer()
+        try:
+            yield timer
+        except (asyncio.CancelledError, asyncio.TimeoutError):
+            self.aborted += 1
+            raise
+        except Exception:
+            self.failed += 1
+            raise
+        total = time.perf_counter() - timer.start
+        self.completed += 1
+        self._totals.append(total)
+        # without streaming, the whole answer is the first token
+        self._ttfts.append(total if timer.ttft is None else timer.ttft)
+
+    @staticmethod
+    def _percentile(values: deque[float], q: float) -> float:
+        if not values:
+            return 0.0
+        ordered = sorted(values)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    def stats(self) -> dict[str, float]:
+        return {
+            "completed": self.completed,
+            "aborted": self.aborted,
+            "failed": self.failed,
+            "ttft_p50": self._percentile(self._ttfts, 0.5),
+            "ttft_p95": self._percentile(self._ttfts, 0.95),
+            "total_p50": self._percentile(self._totals, 0.5),
+            "total_p95": self._percentile(self._totals, 0.95),
+        }
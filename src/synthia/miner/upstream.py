@@ -0,0 +1,117 @@
+import asyncio
+import time
+from types import SimpleNamespace
+from typing import Any
+
+import aiohttp
+
+
+class UpstreamSession:
+    """Long-lived keep-alive HTTP session to an upstream LLM API.
+
+    Connections are pooled, up to `pool_size`, and kept open for
+    `keepalive_timeout` seconds after their last request, so back to back
+    generations skip the DNS lookup and the TCP and TLS handshakes. A trace
+    config counts new and reused connections and times their setup, which
+    `stats` reports.
+    """
+
+    def __init__(
+        self,
+        pool_size: int = 100,
+        connect_timeout: float = 10,
+        read_timeout: float = 120,
+        keepalive_timeout: float = 60,
+    ) -> None:
+        self.pool_size = pool_size
+        self.timeout = aiohttp.ClientTimeout(
+            sock_connect=connect_timeout, sock_read=read_timeout
+        )
+        self.keepalive_timeout = keepalive_timeout
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._session: aiohttp.ClientSession | None = None
+        self.requests = 0
+        self.connections_created = 0
+        self.connections_reused = 0
+        self.connect_time = 0.0
+        self.dns_time = 0.0
+
+    def _trace_config(self) -> aiohttp.TraceConfig:
+        trace_config = aiohttp.TraceConfig()
+
+        async def on_request_start(
+            _session: aiohttp.ClientSession, _context: SimpleNamespace, _params: Any
+        ) -> None:
+            self.requests += 1
+
+        async def on_create_start(
+            _session: aiohttp.ClientSession, context: SimpleNamespace, _params: Any
+        ) -> None:
+            context.connect_start = time.perf_counter()
+
+        async def on_create_end(
+            _session: aiohttp.ClientSession, context: SimpleNamespace, _params: Any
+        ) -> None:
+            # includes the DNS lookup and the TLS handshake
+            self.connections_created += 1
+            self.connect_time += time.perf_counter() - context.connect_start
+
+        async def on_reuse(
+            _session: aiohttp.ClientSession, _context: SimpleNamespace, _params: Any
+        ) -> None:
+            self.connections_reused += 1
+
+        async def on_dns_start(
+            _session: aiohttp.ClientSession, context: SimpleNamespace, _params: Any
+        ) -> None:
+            context.dns_start = time.perf_counter()
+
+        async def on_dns_end(
+            _session: aiohttp.ClientSession, context: SimpleNamespace, _params: Any
+        ) -> None:
+            self.dns_time += time.perf_counter() - context.dns_start
+
+        trace_config.on_request_start.append(on_request_start)
+        trace_config.on_connection_create_start.append(on_create_start)
+        trace_config.on_connection_create_end.append(on_create_end)
+        trace_config.on_connection_reuseconn.append(on_reuse)
+        trace_config.on_dns_resolvehost_start.append(on_dns_start)
+        trace_config.on_dns_resolvehost_end.append(on_dns_end)
+        return trace_config
+
+    def get(self) -> aiohttp.ClientSession:
+        # sessions are bound to the event loop they are created in
+        loop = asyncio.get_running_loop()
+        if self._session is None or self._session.closed or self._loop is not loop:
+            connector = aiohttp.TCPConnector(
+                limit=self.pool_size,
+                keepalive_timeout=self.keepalive_timeout,
+                ttl_dns_cache=300,
+            )
+            self._loop = loop
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=self.timeout,
+                trace_configs=[self._trace_config()],
+            )
+        return self._session
+
+    def stats(self) -> dict[str, float]:
+        created = self.connections_created
+        return {
+            "requests": self.requests,
+            "connections_created": created,
+            "connections_reused": self.connections_reused,
+            "avg_connect_ms": 1000 * self.connect_time / created if created else 0.0,
+            "avg_dns_ms": 1000 * self.dns_time / created if created else 0.0,
+            # connection setup skipped thanks to the reused connections
+            "saved_connect_ms": (
+                1000 * self.connect_time / created * self.connections_reused
+                if created else 0.0
+            ),
+        }
+
+    async def close(self) -> None:
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
@@ -10,7 +10,7 @@ async def test_text_validator():
     node_url = get_node_url()
     com_client = CommuneClient(node_url)
     validator = TextValidator(key,3, com_client)
-    val_dataset = validator._get_validation_dataset(ValidatorSettings(), 1)[0] #type: ignore
+    val_dataset = (await validator._get_validation_dataset(ValidatorSettings(), 1))[0] #type: ignore
     ip_port = ["127.0.0.1", "8000"]
     target_ss58 = ""
     miner_info = (ip_port, target_ss58)
@@ -0,0 +1,62 @@
+import random
+import time
+
+from fuzzywuzzy import fuzz  # type: ignore
+
+from synthia.validator.dedup import find_duplicate_groups
+
+WORDS_PER_ANSWER = 700
+VOCABULARY = (
+    "the a of to and in is that for on with as by this are be it from at "
+    "an which or can their has its these more between also such other "
+    "system theory model function category logic proof type network data "
+    "process structure energy information agent emergence inference "
+    "distributed computation algebra equation principle behavior"
+).split()
+
+
+def make_answers(amount: int, copies: int) -> dict[int, str]:
+    rng = random.Random(42)
+    answers = {
+        uid: " ".join(rng.choice(VOCABULARY) for _ in range(WORDS_PER_ANSWER))
+        for uid in range(amount - copies)
+    }
+    # near duplicates: an existing answer with a few words changed
+    for uid in range(amount - copies, amount):
+        words = answers[rng.randrange(amount - copies)].split()
+        for _ in range(10):
+            words[rng.randrange(len(words))] = rng.choice(VOCABULARY)
+        answers[uid] = " ".join(words)
+    return answers
+
+
+def quadratic_loop(answers: dict[int, str]):
+    # what validate_step used to do
+    response_cache: list[str] = []
+    for miner_answer in answers.values():
+        for answer in response_cache:
+            _ = fuzz.ratio(answer, miner_answer)  # type: ignore
+        response_cache.append(miner_answer)
+
+
+def main():
+    for amount in (100, 250, 500):
+        answers = make_answers(amount, copies=amount // 10)
+
+        start = time.perf_counter()
+        quadratic_loop(answers)
+        loop_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        groups = find_duplicate_groups(answers)
+        index_time = time.perf_counter() - start
+
+        num_groups = len(set(map(tuple, groups.values())))
+        print(
+            f"{amount} answers: fuzz.ratio loop {loop_time:.2f}s, "
+            f"minhash index {index_time:.2f}s, {num_groups} duplicate groups"
+        )
+
+
+if __name__ == "__main__":
+    main()
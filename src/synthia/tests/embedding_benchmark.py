@@ -0,0 +1,60 @@
+import asyncio
+import random
+import time
+
+import typer
+
+from synthia.validator.local_embedder import LocalTransformerEmbedder
+from synthia.validator.similarity import (AsyncEmbedder, AsyncOpenAIEmbedder,
+                                          Embedder, OpenAISettings)
+
+# roughly the size of a miner answer
+WORDS_PER_TEXT = 700
+VOCABULARY = (
+    "the a of to and in is that for on with as by this are be it from at "
+    "an which or can their has its these more between also such other "
+    "system theory model function category logic proof type network data "
+    "process structure energy information agent emergence inference "
+    "distributed computation algebra equation principle behavior"
+).split()
+
+
+def make_texts(amount: int) -> list[str]:
+    rng = random.Random(42)
+    return [
+        " ".join(rng.choice(VOCABULARY) for _ in range(WORDS_PER_TEXT))
+        for _ in range(amount)
+    ]
+
+
+def bench_sync(embedder: Embedder, texts: list[str]) -> float:
+    embedder.get_embeddings(texts[:2])  # warm up
+    start = time.perf_counter()
+    embedder.get_embeddings(texts)
+    return len(texts) / (time.perf_counter() - start)
+
+
+def bench_async(embedder: AsyncEmbedder, texts: list[str]) -> float:
+    async def run():
+        await embedder.get_embeddings(texts[:2])
+        start = time.perf_counter()
+        await embedder.get_embeddings(texts)
+        return len(texts) / (time.perf_counter() - start)
+    return asyncio.run(run())
+
+
+def main(
+    amount: int = 64,
+    threads: int = 4,
+    remote: bool = True,
+):
+    texts = make_texts(amount)
+    local = LocalTransformerEmbedder(num_threads=threads)
+    print(f"local ({local.model}, {threads} threads): {bench_sync(local, texts):.2f} texts/s")
+    if remote:
+        openai_embedder = AsyncOpenAIEmbedder(OpenAISettings())  # type: ignore
+        print(f"remote ({openai_embedder.model}): {bench_async(openai_embedder, texts):.2f} texts/s")
+
+
+if __name__ == "__main__":
+    typer.run(main)
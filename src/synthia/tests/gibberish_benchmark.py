@@ -0,0 +1,62 @@
+"""Measures the CPU throughput of the gibberish filter, classifying texts one
+by one as `do_classify` does against padded batches."""
+
+import random
+import time
+
+from synthia.validator.gibberish import GibberishFilter
+from synthia.validator.similarity import do_classify
+
+WORDS = (
+    "the embeddings of a sentence describe its meaning in a space where close "
+    "vectors have similar meanings so the distance between two answers tells "
+    "how much they agree about a subject"
+).split()
+
+
+def make_texts(amount: int) -> list[str]:
+    rng = random.Random(0)
+    texts: list[str] = []
+    for i in range(amount):
+        words = rng.choices(WORDS, k=rng.randint(20, 400))
+        if i % 5 == 0:
+            # word salad
+            rng.shuffle(words)
+        if i % 7 == 0:
+            words = ["".join(rng.choices("qwxzkjv", k=8)) for _ in words]
+        texts.append(" ".join(words))
+    return texts
+
+
+def main(amount: int = 256) -> None:
+    texts = make_texts(amount)
+    classifier = GibberishFilter().load()
+    assert classifier is not None, "the classifier could not be loaded"
+    # warm up
+    GibberishFilter(classifier=classifier).classify(texts[:4])
+
+    start = time.perf_counter()
+    sequential = [
+        do_classify(classifier, text[:2000]) is not None for text in texts
+    ]
+    sequential_time = time.perf_counter() - start
+
+    for batch_size in (8, 16, 32, 64):
+        gibberish = GibberishFilter(batch_size=batch_size, classifier=classifier)
+        start = time.perf_counter()
+        batched = gibberish.classify(texts)
+        batched_time = time.perf_counter() - start
+        agreement = sum(a == b for a, b in zip(sequential, batched)) / amount
+        print(
+            f"batch {batch_size:>2}: {amount / batched_time:6.1f} texts/s "
+            f"(one by one: {amount / sequential_time:6.1f} texts/s), "
+            f"{agreement:.0%} same verdicts, {batched.count(False)} rejected"
+        )
+
+    start = time.perf_counter()
+    gibberish.classify(texts)
+    print(f"cached: {amount / (time.perf_counter() - start):.0f} texts/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""Measures how many concurrent requests a miner serves, with the async
+upstream client against the sync fallback, using a local stub of the
+OpenRouter API that answers after a fixed delay."""
+
+import asyncio
+import time
+
+from aiohttp import web
+
+from synthia.miner._config import OpenrouterSettings
+from synthia.miner.anthropic import OpenrouterModule
+
+UPSTREAM_DELAY = 0.5
+
+
+async def completions(request: web.Request) -> web.Response:
+    await asyncio.sleep(UPSTREAM_DELAY)
+    return web.json_response({
+        "choices": [{
+            "finish_reason": "end_turn",
+            "message": {"content": "an explanation"},
+        }]
+    })
+
+
+async def start_upstream() -> tuple[web.AppRunner, int]:
+    app = web.Application()
+    app.router.add_post("/api/v1/chat/completions", completions)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]  # type: ignore
+    return runner, port
+
+
+async def measure(module: OpenrouterModule, requests: int) -> float:
+    start = time.perf_counter()
+    results = await asyncio.gather(
+        *(module.generate(f"question {i}") for i in range(requests))
+    )
+    assert all(result["answer"] == "an explanation" for result in results)
+    return time.perf_counter() - start
+
+
+async def main() -> None:
+    runner, port = await start_upstream()
+    try:
+        for use_async in (False, True):
+            settings = OpenrouterSettings(
+                api_key="stub",
+                base_url=f"http://127.0.0.1:{port}/api/v1",
+                use_async=use_async,
+                # every request has to reach the upstream
+                response_cache_ttl=0,
+            )
+            module = OpenrouterModule(settings)
+            for requests in (10, 100, 400):
+                elapsed = await measure(module, requests)
+                print(
+                    f"{'async' if use_async else 'sync '} {requests:>3} requests: "
+                    f"{elapsed:5.2f}s, {requests / elapsed:6.1f} req/s "
+                    f"(upstream takes {UPSTREAM_DELAY}s)"
+                )
+            print(f"      upstream connections: {module.stats()['upstream']}")
+            await module.upstream.close()
+    finally:
+        await runner.cleanup()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,110 @@
+"""Checks streamed generations and deadline aborts of the OpenRouter miner,
+against a local stub of the API streaming one token at a fixed pace.
+
+An aborted generation must close the upstream stream, and must not leave
+its answer in the response cache or to later requests for the prompt."""
+
+import asyncio
+import json
+import time
+
+from aiohttp import web
+from fastapi import HTTPException
+
+from synthia.miner._config import OpenrouterSettings
+from synthia.miner.anthropic import OpenrouterModule
+
+TOKENS = 20
+TOKEN_DELAY = 0.1
+
+
+class StubUpstream:
+    def __init__(self) -> None:
+        self.completed = 0
+        self.disconnected = 0
+
+    async def completions(self, request: web.Request) -> web.StreamResponse:
+        response = web.StreamResponse(
+            headers={"Content-Type": "text/event-stream"}
+        )
+        await response.prepare(request)
+        try:
+            await response.write(b": OPENROUTER PROCESSING\n\n")
+            for i in range(TOKENS):
+                await asyncio.sleep(TOKEN_DELAY)
+                chunk = {"choices": [{"delta": {"content": f"token{i} "}}]}
+                await response.write(f"data: {json.dumps(chunk)}\n\n".encode())
+            last = {"choices": [{"delta": {}, "finish_reason": "end_turn"}]}
+            await response.write(f"data: {json.dumps(last)}\n\n".encode())
+            await response.write(b"data: [DONE]\n\n")
+        except ConnectionResetError:
+            # the miner closed the connection
+            self.disconnected += 1
+            return response
+        self.completed += 1
+        return response
+
+
+async def main() -> None:
+    upstream = StubUpstream()
+    app = web.Application()
+    app.router.add_post("/api/v1/chat/completions", upstream.completions)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]  # type: ignore
+    module = OpenrouterModule(OpenrouterSettings(
+        api_key="stub",
+        base_url=f"http://127.0.0.1:{port}/api/v1",
+        deadline_margin=0.2,
+    ))
+    try:
+        result = await module.generate("what is entropy?")
+        assert result["answer"].split() == [f"token{i}" for i in range(TOKENS)]
+        timings = module.timings.stats()
+        print(
+            f"streamed: first token after {timings['ttft_p50']:.2f}s, "
+            f"whole answer after {timings['total_p50']:.2f}s"
+        )
+
+        deadline = TOKENS * TOKEN_DELAY / 2
+        start = time.perf_counter()
+        try:
+            await module.generate("what is enthalpy?", deadline=deadline)
+            raise AssertionError("the generation should have been aborted")
+        except HTTPException as e:
+            assert e.status_code == 504
+        elapsed = time.perf_counter() - start
+        assert elapsed < deadline
+        await asyncio.sleep(2 * TOKEN_DELAY)
+        assert upstream.disconnected == 1 and upstream.completed == 1
+        assert module.single_flight.stats()["in_flight"] == 0
+        assert module.response_cache is not None
+        assert module.response_cache.stats()["entries"] == 1
+        print(
+            f"deadline of {deadline}s: aborted after {elapsed:.2f}s, "
+            "upstream stream closed, nothing cached"
+        )
+
+        # without a deadline, the prompt is generated from scratch
+        result = await module.generate("what is enthalpy?")
+        assert len(result["answer"].split()) == TOKENS
+        assert upstream.completed == 2
+        assert module.response_cache.stats()["entries"] == 2
+        print("the aborted prompt is generated again on the next request")
+
+        try:
+            await module.generate("what is exergy?", deadline=0.1)
+            raise AssertionError("the deadline can't be met")
+        except HTTPException as e:
+            assert e.status_code == 504
+        assert module.single_flight.stats()["in_flight"] == 0
+        print(f"stats: {module.stats()['timings']}")
+    finally:
+        await module.upstream.close()
+        await runner.cleanup()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,146 @@
+"""Checks the chain node pool routing and failover against local stub nodes.
+
+Each stub node is a minimal websocket JSON-RPC server that answers
+`chain_getHeader` after a configurable delay, and can be taken down.
+"""
+
+import base64
+import hashlib
+import json
+import socket
+import struct
+import threading
+import time
+from typing import Any
+
+import websocket  # type: ignore
+
+from synthia.validator.node_pool import NodePool
+
+WS_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+
+
+class StubNode:
+    def __init__(self, delay: float, block: int) -> None:
+        self.delay = delay
+        self.block = block
+        self.calls = 0
+        self.down = False
+        self.sock = socket.socket()
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.sock.bind(("127.0.0.1", 0))
+        self.sock.listen()
+        self.url = f"ws://127.0.0.1:{self.sock.getsockname()[1]}"
+        threading.Thread(target=self._accept, daemon=True).start()
+
+    def _accept(self) -> None:
+        while True:
+            conn, _ = self.sock.accept()
+            threading.Thread(target=self._serve, args=(conn,), daemon=True).start()
+
+    def _serve(self, conn: socket.socket) -> None:
+        file = conn.makefile("rb")
+        headers: dict[str, str] = {}
+        while (line := file.readline().decode()) not in ("\r\n", ""):
+            name, _, value = line.partition(":")
+            headers[name.strip().lower()] = value.strip()
+        accept = base64.b64encode(
+            hashlib.sha1((headers["sec-websocket-key"] + WS_GUID).encode()).digest()
+        ).decode()
+        conn.sendall(
+            "HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\n"
+            f"Connection: Upgrade\r\nSec-WebSocket-Accept: {accept}\r\n\r\n".encode()
+        )
+        while True:
+            request = _read_frame(file)
+            if request is None or self.down:
+                conn.close()
+                return
+            self.calls += 1
+            time.sleep(self.delay)
+            body = json.loads(request)
+            result = {"number": hex(self.block)}
+            _send_frame(conn, json.dumps({"jsonrpc": "2.0", "id": body["id"], "result": result}))
+
+
+def _read_frame(file: Any) -> str | None:
+    header = file.read(2)
+    if len(header) < 2:
+        return None
+    length = header[1] & 0x7F
+    if length == 126:
+        length = struct.unpack(">H", file.read(2))[0]
+    elif length == 127:
+        length = struct.unpack(">Q", file.read(8))[0]
+    mask = file.read(4)
+    payload = bytes(b ^ mask[i % 4] for i, b in enumerate(file.read(length)))
+    return payload.decode() if header[0] & 0x0F == 1 else None
+
+
+def _send_frame(conn: socket.socket, text: str) -> None:
+    payload = text.encode()
+    if len(payload) < 126:
+        header = bytes([0x81, len(payload)])
+    else:
+        header = bytes([0x81, 126]) + struct.pack(">H", len(payload))
+    conn.sendall(header + payload)
+
+
+class StubChainClient:
+    """Speaks just enough JSON-RPC to read the current block."""
+
+    def __init__(self, url: str) -> None:
+        self.url = url
+        self.ws = websocket.create_connection(url, timeout=2)
+        self.request_id = 0
+
+    def get_block(self) -> dict[str, Any]:
+        self.request_id += 1
+        self.ws.send(json.dumps(
+            {"jsonrpc": "2.0", "id": self.request_id, "method": "chain_getHeader", "params": []}
+        ))
+        header = json.loads(self.ws.recv())["result"]
+        return {"header": {"number": int(header["number"], 16)}}
+
+
+def main() -> None:
+    fast, slow, lagging = StubNode(0.01, 1000), StubNode(0.1, 1000), StubNode(0, 900)
+    nodes = {fast.url: "fast", slow.url: "slow", lagging.url: "lagging"}
+    pool = NodePool(
+        list(nodes),
+        size=3,
+        probe_interval=3600,
+        failure_threshold=2,
+        base_backoff=0.05,
+        client_factory=StubChainClient,  # type: ignore
+    )
+
+    def current_url(client: Any) -> str:
+        client.get_block()
+        return client.url
+
+    picked = nodes[pool.run(current_url)]
+    print(f"picked {picked}: {pool.stats()}")
+    assert picked == "fast", "the lagging node is faster but behind, so the fast one wins"
+
+    fast.down = True
+    picked = nodes[pool.run(current_url)]
+    print(f"fast node down, picked {picked}")
+    assert picked == "slow"
+    picked = nodes[pool.run(current_url)]
+    assert picked == "slow", "a node that just failed is only used as a last resort"
+
+    fast.down = False
+    # its dropped connection fails the probe and opens the circuit, then the
+    # node is reconnected once the backoff passes
+    pool.probe()
+    time.sleep(0.1)
+    pool.probe()
+    picked = nodes[pool.run(current_url)]
+    print(f"fast node back up, picked {picked}: {pool.stats()}")
+    assert picked == "fast"
+    print("ok")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""Checks that pooled questions embedded by another embedder, or with another
+dimension, are dropped instead of reaching the scoring."""
+
+import os
+import tempfile
+import time
+
+from synthia.validator.generate_data import ValidationDataset
+from synthia.validator.meta_prompt import Criteria
+from synthia.validator.question_pool import QuestionPool
+
+
+def make_question(dimension: int) -> ValidationDataset:
+    criteria = Criteria(
+        subject_type="concept",
+        specificity="broad",
+        target_audience="layman",
+        detail="high",
+        abstraction="low",
+        field="physics",
+    )
+    return ValidationDataset(
+        prompt="prompt",
+        val_answer="answer",
+        criteria=criteria,
+        question_age=time.time(),
+        chosen_subject="entropy",
+        embedded_val_answer=[0.1] * dimension,
+    )
+
+
+def main() -> None:
+    path = os.path.join(tempfile.mkdtemp(), "question_pool.json")
+    pool = QuestionPool(path, embedder="text-embedding-3-small")
+    for _ in range(10):
+        pool.add(make_question(1536))
+    pool.save()
+
+    assert len(QuestionPool(path, embedder="text-embedding-3-small")) == 10
+    print("same embedder: the pooled questions are kept")
+
+    assert len(QuestionPool(path, embedder="BAAI/bge-small-en-v1.5")) == 0
+    print("another embedder: the pooled questions are dropped")
+
+    pool = QuestionPool(path, embedder="text-embedding-3-small")
+    pool.add(make_question(384))
+    assert len(pool) == 1 and pool.dimension == 384
+    assert all(len(item.embedded_val_answer) == 384 for item in pool.sample(5))
+    print("another dimension: only the questions of the new one are kept")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+import time
+
+import numpy as np
+
+from synthia.validator.similarity import euclidean_distance, score_embeddings
+
+EMBEDDING_DIM = 1536
+NUM_QUESTIONS = 5
+
+
+def per_miner_scores(
+    miner_embeddings: list[list[float]], val_embeddings: list[list[float]]
+) -> list[float]:
+    # the formula `TextValidator` used to apply to each miner answer
+    scores: list[float] = []
+    for miner_embedding, val_embedding in zip(miner_embeddings, val_embeddings):
+        distance = euclidean_distance(miner_embedding, val_embedding)
+        miner_norm = np.linalg.norm(miner_embedding)
+        val_norm = np.linalg.norm(val_embedding)
+        scores.append(1 - float(distance / (miner_norm + val_norm)))
+    return scores
+
+
+def main():
+    rng = np.random.default_rng(42)
+    for num_miners in (1_000, 10_000):
+        val_matrix = rng.normal(size=(NUM_QUESTIONS, EMBEDDING_DIM)).astype(np.float32)
+        val_index = rng.integers(0, NUM_QUESTIONS, size=num_miners)
+        noise = rng.normal(scale=0.5, size=(num_miners, EMBEDDING_DIM))
+        miner_matrix = (val_matrix[val_index] + noise).astype(np.float32)
+        # what the embedders return
+        miner_lists = miner_matrix.tolist()
+        val_lists = val_matrix[val_index].tolist()
+
+        start = time.perf_counter()
+        expected = per_miner_scores(miner_lists, val_lists)
+        loop_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        scores = score_embeddings(
+            np.asarray(miner_lists, dtype=np.float32),
+            np.asarray(val_matrix, dtype=np.float32),
+            val_index,
+        )
+        batch_time = time.perf_counter() - start
+
+        assert np.allclose(scores, expected, rtol=0, atol=1e-6)
+        print(
+            f"{num_miners} miners: per-miner loop {loop_time * 1000:.1f}ms, "
+            f"batch {batch_time * 1000:.1f}ms ({loop_time / batch_time:.0f}x), "
+            f"max abs diff {np.max(np.abs(scores - np.array(expected))):.2e}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""Checks that a scoring batch failing doesn't stall the scoring of a cycle:
+the other batches are still scored and the call returns."""
+
+import asyncio
+import time
+
+from synthia.validator._config import ValidatorSettings
+from synthia.validator.generate_data import ValidationDataset
+from synthia.validator.meta_prompt import Criteria
+from synthia.validator.text_validator import TextValidator
+
+ANSWERS = 20
+
+
+async def responses(val_info: ValidationDataset):
+    for uid in range(ANSWERS):
+        yield uid, (f"answer {uid}", val_info)
+
+
+async def main() -> None:
+    criteria = Criteria("concept", "broad", "layman", "high", "low", "physics")
+    val_info = ValidationDataset(
+        prompt="prompt",
+        val_answer="answer",
+        criteria=criteria,
+        question_age=time.time(),
+        chosen_subject="entropy",
+        embedded_val_answer=[1.0, 0.0],
+    )
+    # only the scoring pipeline is exercised, without chain or miners
+    validator = TextValidator.__new__(TextValidator)
+    validator.gibberish_filter = None
+
+    async def embed(miner_answers: list[str]) -> list[list[float] | None]:
+        if "answer 7" in miner_answers:
+            raise RuntimeError("inference failed")
+        return [[1.0, 0.0] for _ in miner_answers]
+
+    validator._embed_miner_answers = embed  # type: ignore
+    settings = ValidatorSettings(
+        embedding_batch_size=2, scoring_workers=1, gibberish_filter=False
+    )  # type: ignore
+    scored, _ = await asyncio.wait_for(
+        validator._score_answers(settings, responses(val_info)),  # type: ignore
+        timeout=5,
+    )
+    assert 7 not in scored
+    assert len(scored) >= ANSWERS - settings.embedding_batch_size
+    print(f"a failing batch: {len(scored)} of {ANSWERS} answers scored, no stall")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
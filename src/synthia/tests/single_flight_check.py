@@ -0,0 +1,111 @@
+"""Checks that concurrent identical prompts reach the upstream once, with a
+stub LLM, and that errors and cancellations are handled like single calls."""
+
+import asyncio
+
+from fastapi import HTTPException
+
+from synthia.miner.BaseLLM import BaseLLM
+
+UPSTREAM_DELAY = 0.3
+
+
+class StubLLM(BaseLLM):
+    def __init__(self, fail: bool = False) -> None:
+        super().__init__()
+        self.fail = fail
+        self.calls = 0
+        self.cancelled = 0
+
+    def prompt(
+            self, user_prompt: str, system_prompt: str | None = None
+            ) -> tuple[str | None, str]:
+        raise NotImplementedError
+
+    async def aprompt(
+            self, user_prompt: str, system_prompt: str | None = None
+            ) -> tuple[str | None, str]:
+        self.calls += 1
+        try:
+            await asyncio.sleep(UPSTREAM_DELAY)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        if self.fail:
+            raise RuntimeError("upstream is down")
+        return f"answer to {user_prompt}", ""
+
+    @property
+    def max_tokens(self) -> int:
+        return 3000
+
+    @property
+    def model(self) -> str:
+        return "stub"
+
+    @property
+    def temperature(self) -> float:
+        return 0.5
+
+
+async def check_coalescing(requests: int) -> None:
+    llm = StubLLM()
+    results = await asyncio.gather(
+        *(llm.generate("what is entropy?") for _ in range(requests)),
+        llm.generate("what is enthalpy?"),
+    )
+    assert llm.calls == 2, llm.calls
+    assert results[:-1] == [{"answer": "answer to what is entropy?"}] * requests
+    assert results[-1] == {"answer": "answer to what is enthalpy?"}
+    # the call is over, the next request goes upstream again
+    await llm.generate("what is entropy?")
+    assert llm.calls == 3
+    print(f"{requests} identical requests: {llm.calls - 2} upstream call, {llm.stats()}")
+
+
+async def check_errors(requests: int) -> None:
+    llm = StubLLM(fail=True)
+    results = await asyncio.gather(
+        *(llm.generate("what is entropy?") for _ in range(requests)),
+        return_exceptions=True,
+    )
+    assert llm.calls == 1
+    assert all(
+        isinstance(result, HTTPException) and result.detail == "upstream is down"
+        for result in results
+    )
+    print(f"error raised to all {requests} requests from 1 upstream call")
+
+
+async def check_cancellation() -> None:
+    llm = StubLLM()
+    first = asyncio.create_task(llm.generate("what is entropy?"))
+    second = asyncio.create_task(llm.generate("what is entropy?"))
+    await asyncio.sleep(UPSTREAM_DELAY / 3)
+    # another request still waits for the answer
+    first.cancel()
+    assert await second == {"answer": "answer to what is entropy?"}
+    assert first.cancelled() and llm.cancelled == 0
+    print("cancelling one request leaves the others running")
+
+    requests = [
+        asyncio.create_task(llm.generate("what is enthalpy?")) for _ in range(3)
+    ]
+    await asyncio.sleep(UPSTREAM_DELAY / 3)
+    for request in requests:
+        request.cancel()
+    await asyncio.gather(*requests, return_exceptions=True)
+    await asyncio.sleep(0)
+    assert llm.cancelled == 1, llm.cancelled
+    assert llm.single_flight.stats()["in_flight"] == 0
+    print("cancelling all the requests cancels the upstream call")
+
+
+async def main() -> None:
+    await check_coalescing(50)
+    await check_errors(20)
+    await check_cancellation()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,104 @@
+"""Compares the array weight pipeline with the dict based one it replaced,
+checking that both compute the same vote.
+
+numpy's exp may differ from math.exp in the last bit, which can move a
+weight sitting right at a rounding boundary by one, so weights are checked
+to be within one of the old ones and the exact matches are counted."""
+
+import math
+import time
+
+import numpy as np
+
+from synthia.validator.sigmoid import threshold_sigmoid_rewards
+from synthia.validator.weights import compute_weights, normalize_weights, top_k
+
+MAX_ALLOWED_WEIGHTS = 420
+
+
+def legacy_weights(score_dict: dict[int, float], max_allowed_weights: int):
+    sorted_scores = sorted(score_dict.items(), key=lambda x: x[1], reverse=True)
+    cut = dict(sorted_scores[:max_allowed_weights])
+
+    mean_score = sum(cut.values()) / len(cut)
+    threshold = mean_score * (1 + 0.2)
+    adjusted: dict[int, float] = {}
+    for uid, score in cut.items():
+        reward_ratio = 1 / (1 + math.exp(-((score - threshold) * 5.0)))
+        adjusted[uid] = 0.01 + (1.0 - 0.01) * reward_ratio
+
+    total = sum(adjusted.values())
+    weights = {uid: int(score * 1000 / total) for uid, score in adjusted.items()}
+    weights = {uid: weight for uid, weight in weights.items() if weight != 0}
+    return cut, adjusted, list(weights.keys()), list(weights.values())
+
+
+def check_parity(score_dict: dict[int, float], max_allowed_weights: int) -> bool:
+    cut, adjusted, legacy_uids, legacy_weights_ = legacy_weights(
+        score_dict, max_allowed_weights
+    )
+    uids = np.fromiter(score_dict.keys(), dtype=np.int64)
+    scores = np.fromiter(score_dict.values(), dtype=np.float64)
+    cut_uids, cut_scores = top_k(uids, scores, max_allowed_weights)
+    assert cut_uids.tolist() == list(cut.keys())
+    assert cut_scores.tolist() == list(cut.values())
+
+    rewards = threshold_sigmoid_rewards(cut_scores)
+    assert np.allclose(rewards, list(adjusted.values()), rtol=1e-15, atol=0)
+
+    # the defaults, as used by set_weights
+    new_uids, new_weights = compute_weights(score_dict, max_allowed_weights)
+    floor = dict(zip(legacy_uids, legacy_weights_))
+    new = dict(zip(new_uids, new_weights))
+    assert set(new) <= set(cut) and set(floor) <= set(cut)
+    assert all(abs(new.get(uid, 0) - floor.get(uid, 0)) <= 1 for uid in cut)
+    exact = new_uids == legacy_uids and new_weights == legacy_weights_
+
+    new_uids, new_weights = compute_weights(
+        score_dict, max_allowed_weights, largest_remainder=True
+    )
+    assert sum(new_weights) == 1000
+    assert all(0 <= w - new.get(uid, 0) <= 1 for uid, w in zip(new_uids, new_weights))
+    return exact
+
+
+def random_scores(rng: np.random.Generator, size: int) -> dict[int, float]:
+    # rounded, so there are plenty of ties around the cut
+    scores = np.round(rng.beta(5, 2, size), 3)
+    uids = rng.permutation(size * 2)[:size]
+    return dict(zip(uids.tolist(), scores.tolist()))
+
+
+def main() -> None:
+    rng = np.random.default_rng(0)
+    votes = exact = 0
+    for _ in range(20):
+        for size in (1, 5, 100, 421, 1000):
+            for k in (1, 5, 420, 2000):
+                exact += check_parity(random_scores(rng, size), k)
+                votes += 1
+    exact += check_parity({1: 0.5, 2: 0.5, 3: 0.5}, 2)
+    votes += 1
+    print(f"parity ok: {exact} of {votes} votes identical, the rest within one")
+
+    for size in (10_000, 50_000, 100_000):
+        score_dict = random_scores(rng, size)
+        start = time.perf_counter()
+        legacy_weights(score_dict, MAX_ALLOWED_WEIGHTS)
+        legacy_time = time.perf_counter() - start
+        start = time.perf_counter()
+        compute_weights(score_dict, MAX_ALLOWED_WEIGHTS)
+        new_time = time.perf_counter() - start
+        print(
+            f"{size:>7} uids: dicts {legacy_time * 1000:7.1f}ms, "
+            f"arrays {new_time * 1000:6.1f}ms ({legacy_time / new_time:.1f}x)"
+        )
+
+    rewards = threshold_sigmoid_rewards(np.asarray(list(score_dict.values())))
+    start = time.perf_counter()
+    normalize_weights(rewards)
+    print(f"normalizing {len(rewards)} rewards: {(time.perf_counter() - start) * 1000:.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
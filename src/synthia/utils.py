@@ -1,10 +1,12 @@
+import asyncio
 import datetime
 import random
 import sys
 import time
 from functools import wraps
+from itertools import count
 from time import sleep
-from typing import Any, Callable, Literal, ParamSpec, TypeVar
+from typing import Any, Awaitable, Callable, Literal, ParamSpec, TypeVar
 
 T = TypeVar("T")
 T1 = TypeVar("T1")
@@ -43,25 +45,60 @@ def log(
     print(f"[{iso_timestamp_now()}] " + msg, *values, sep=sep, end=end, file=file, flush=flush)
 
 
+def _retry_delay(
+        func: Callable[..., Any],
+        e: Exception,
+        tries: int,
+        max_retries: int | None,
+        retry_exceptions: list[type],
+    ) -> float:
+    """Delay before trying `func` again after it raised `e` on try `tries`.
+
+    Re-raises `e` if it isn't one of `retry_exceptions`, or if the tries
+    are exhausted.
+    """
+    if not any(isinstance(e, exception_t) for exception_t in retry_exceptions):
+        raise e
+    log(f"An exception occurred in '{func.__name__} on try {tries}': {e}, but we'll retry.")
+    if tries >= (max_retries or sys.maxsize):
+        raise e
+    return (1.4 ** tries) + random.uniform(0, 1)
+
+
 def retry(max_retries: int | None, retry_exceptions: list[type]):
     assert max_retries is None or max_retries > 0
 
     def decorator(func: Callable[P, R]) -> Callable[P, R]:
-        def wrapper(*args: P.args, **kwargs: P.kwargs):
-            max_retries__ = max_retries or sys.maxsize  # TODO: fix this ugly thing
-            for tries in range(max_retries__ + 1):
+        @wraps(func)
+        def wrapper(*args: P.args, **kwargs: P.kwargs) -> R:
+            for tries in count():
+                try:
+                    return func(*args, **kwargs)
+                except Exception as e:
+                    sleep(_retry_delay(func, e, tries, max_retries, retry_exceptions))
+            raise Exception("Unreachable")
+        return wrapper
+    return decorator
+
+
+def async_retry(max_retries: int | None, retry_exceptions: list[type]):
+    """Same as `retry`, for coroutine functions.
+
+    Waits between tries with `asyncio.sleep`, so only the retried call is
+    delayed and the rest of the event loop keeps running.
+    """
+    assert max_retries is None or max_retries > 0
+
+    def decorator(func: Callable[P, Awaitable[R]]) -> Callable[P, Awaitable[R]]:
+        @wraps(func)
+        async def wrapper(*args: P.args, **kwargs: P.kwargs) -> R:
+            for tries in count():
                 try:
-                    result = func(*args, **kwargs)
-                    return result
+                    return await func(*args, **kwargs)
                 except Exception as e:
-                    if any(isinstance(e, exception_t) for exception_t in retry_exceptions):
-                        func_name = func.__name__
-                        log(f"An exception occurred in '{func_name} on try {tries}': {e}, but we'll retry.")
-                        if tries < max_retries__:
-                            delay = (1.4 ** tries) + random.uniform(0, 1)
-                            sleep(delay)
-                            continue
-                    raise e
+                    await asyncio.sleep(
+                        _retry_delay(func, e, tries, max_retries, retry_exceptions)
+                    )
             raise Exception("Unreachable")
         return wrapper
-    return decorator
\ No newline at end of file
+    return decorator
@@ -7,6 +7,8 @@ class ValidatorSettings(BaseSettings):
     model: str = "claude-3-5-sonnet-20240620"
     temperature: float = 0.2
     max_tokens: int = 1000
+    # maximum amount of validation explanations generated at the same time
+    max_concurrent_generations: int = 5
 
     # == Scoring ==
     # sleep time between each iteration
@@ -14,8 +16,116 @@ class ValidatorSettings(BaseSettings):
     iteration_interval: int = 360 * 8
     #  this is a global parameter of the maximum weights that a validator can set
     max_allowed_weights: int = 420
+    # gives the weight lost to rounding down to the largest remainders, so
+    # the weights of a vote add up to exactly 1000
+    weights_largest_remainder: bool = False
+    # how long before the next cycle the question pool is topped up
+    prefetch_lead_time: int = 600
+
+    # == Question pool ==
+    question_pool_path: str = "~/.synthia/question_pool.json"
+    question_pool_size: int = 100
+    # the pool is only topped up when it has less questions than this
+    question_pool_low_watermark: int = 25
+    # questions older than this (in seconds) are evicted from the pool
+    question_max_age: int = 6 * 60 * 60
+    # amount of miners a question can be asked to before it's evicted
+    question_max_uses: int = 20
     hf_uploader_ss58: str = "5EX6ixabe8fiWHySw4SYaJAkaHLKeqSJ3rv7so2FrLC2cfGV"
 
+    # == Metagraph ==
+    metagraph_cache_path: str = "~/.synthia/metagraph.json"
+    # module addresses and keys are read again after this many blocks
+    metagraph_refresh_blocks: int = 720
+
+    # == Weight votes ==
+    # keeps the last vote of each subnet and validator key
+    last_vote_path: str = "~/.synthia/last_vote.json"
+    # share of the total weight a vote has to move to be submitted
+    vote_min_change: float = 0.05
+    # a vote is also submitted when the uids with the top k weights change
+    vote_top_k: int = 10
+    # blocks after which a vote is submitted even if nothing changed
+    vote_max_staleness: int = 2160
+    # blocks kept before the subnet MaxWeightAge, when it's lower; has to
+    # be longer than a cycle, which is when votes are checked
+    vote_staleness_margin: int = 400
+
+    # == Answer journal ==
+    # parquet dataset of every scored answer, empty to disable it
+    answer_journal_path: str = "~/.synthia/answers"
+    # days of answers kept, 0 keeps them all
+    answer_journal_retention_days: int = 30
+    # whether to keep the embedding of each answer as well
+    answer_journal_embeddings: bool = False
+
+    # == Data upload ==
+    upload_journal_path: str = "~/.synthia/upload_journal.jsonl"
+    # records kept in memory, the rest waits in the journal
+    upload_queue_size: int = 5000
+    # maximum records and bytes sent in a single upload
+    upload_batch_size: int = 500
+    upload_batch_bytes: int = 4_000_000
+    # seconds between uploads
+    upload_interval: int = 60
+    # longest wait (in seconds) before retrying a failed upload
+    upload_max_backoff: int = 1800
+
+    # == Runtime ==
+    # seconds between metrics reports
+    metrics_interval: int = 300
+
+    # == Chain nodes ==
+    # amount of nodes kept connected at the same time
+    node_pool_size: int = 3
+    # seconds between latency and block height probes of the nodes
+    node_probe_interval: int = 60
+    # consecutive failures after which a node is skipped for a while
+    node_failure_threshold: int = 3
+    # longest time (in seconds) an unhealthy node is skipped for
+    node_max_backoff: int = 300
+
+    # == Miner connections ==
+    miner_pool_limit: int = 512
+    miner_pool_limit_per_host: int = 4
+    # idle connections and clients are closed after this many seconds
+    miner_pool_idle_timeout: int = 60
+
+    # == Miner queries ==
+    # maximum amount of miners queried at the same time
+    max_concurrent_queries: int = 256
+    # lower bound for the per-miner timeouts derived from their latencies,
+    # the upper bound is the validator call timeout
+    min_call_timeout: int = 30
+    # queries still running this many seconds into the cycle are cancelled
+    cycle_query_deadline: int = 300
+    latency_history_path: str = "~/.synthia/miner_latency.json"
+    # amount of past calls per miner the timeouts are derived from
+    latency_history_size: int = 20
+    # tell miners how long they have to answer, so they can stop generating
+    # once it's too late; miners without the deadline parameter ignore it
+    send_miner_deadline: bool = True
+
+    # == Scoring pipeline ==
+    # maximum amount of answers embedded in a single request
+    embedding_batch_size: int = 64
+    # amount of batches embedded and scored at the same time
+    scoring_workers: int = 2
+
+    # == Gibberish filter ==
+    # answers classified as gibberish score 0 without being embedded
+    gibberish_filter: bool = True
+    gibberish_batch_size: int = 32
+    # answers are truncated to this many tokens for classification
+    gibberish_max_length: int = 512
+
+    # == Embedding cache ==
+    embedding_cache_path: str = "~/.synthia/embedding_cache.sqlite"
+    # maximum amount of embeddings kept on disk, least recently used are evicted
+    embedding_cache_max_entries: int = 200_000
+    # amount of embeddings also kept in memory
+    embedding_cache_memory_entries: int = 10_000
+
     class Config:
         env_prefix = "ANTHROPIC_"
         env_file = "env/config.env"
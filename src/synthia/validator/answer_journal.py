@@ -0,0 +1,157 @@
+import os
+import shutil
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any
+
+import numpy as np
+import polars as pl
+
+from ..utils import log
+from ._config import ValidatorSettings
+from .generate_data import ValidationDataset
+
+ANSWER_SCHEMA: dict[str, Any] = {
+    # unix time the cycle started at
+    "cycle": pl.Int64,
+    "uid": pl.Int32,
+    "miner_key": pl.Utf8,
+    "subject_type": pl.Utf8,
+    "specificity": pl.Utf8,
+    "target_audience": pl.Utf8,
+    "detail": pl.Utf8,
+    "abstraction": pl.Utf8,
+    "field": pl.Utf8,
+    "subject": pl.Utf8,
+    # unix time the question was generated at
+    "question_age": pl.Float64,
+    "answer": pl.Utf8,
+    "score": pl.Float64,
+    # seconds the miner took to answer
+    "latency": pl.Float64,
+    # lowest uid of the near duplicate answers, null if the answer is unique
+    "duplicate_of": pl.Int32,
+    "embedding": pl.List(pl.Float32),
+}
+
+
+class AnswerJournal:
+    """Parquet dataset of every scored miner answer.
+
+    Rows are buffered during a cycle and written to
+    `<root>/date=<YYYY-MM-DD>/<cycle>-<part>.parquet`. `add` only buffers;
+    the caller writes a part with `flush` whenever `full`, and once more
+    when the cycle ends, so memory stays bounded however many miners are
+    scored. Writing is blocking, and should run off the event loop, as
+    should `prune`, which deletes the dates older than `retention_days`.
+    Embeddings are only kept with `store_embeddings`, as they make up most
+    of the size.
+    """
+
+    def __init__(
+        self,
+        root: str,
+        store_embeddings: bool = False,
+        max_buffered_rows: int = 1000,
+        retention_days: int = 30,
+    ) -> None:
+        self.root = os.path.expanduser(root)
+        self.store_embeddings = store_embeddings
+        self.max_buffered_rows = max_buffered_rows
+        self.retention_days = retention_days
+        self._rows: list[dict[str, Any]] = []
+        self._cycle = 0
+        self._part = 0
+
+    @classmethod
+    def from_settings(cls, settings: ValidatorSettings) -> "AnswerJournal":
+        return cls(
+            settings.answer_journal_path,
+            store_embeddings=settings.answer_journal_embeddings,
+            retention_days=settings.answer_journal_retention_days,
+        )
+
+    def start_cycle(self, cycle: int | None = None) -> None:
+        """Starts a cycle, the rows of the previous one have to be flushed."""
+        if self._rows:
+            log(f"WARN: Dropping {len(self._rows)} unflushed scored answers")
+            self._rows = []
+        self._cycle = int(time.time()) if cycle is None else cycle
+        self._part = 0
+
+    @property
+    def full(self) -> bool:
+        return len(self._rows) >= self.max_buffered_rows
+
+    def add(
+        self,
+        uid: int,
+        miner_key: str,
+        val_info: ValidationDataset,
+        answer: str,
+        score: float,
+        latency: float | None = None,
+        duplicate_of: int | None = None,
+        embedding: list[float] | None = None,
+    ) -> None:
+        criteria = val_info.criteria
+        if embedding is not None and self.store_embeddings:
+            # polars reads numpy arrays in row dicts as nulls
+            embedding = np.asarray(embedding, dtype=np.float32).tolist()
+        else:
+            embedding = None
+        self._rows.append({
+            "cycle": self._cycle,
+            "uid": uid,
+            "miner_key": miner_key,
+            "subject_type": criteria.subject_type,
+            "specificity": criteria.specificity,
+            "target_audience": criteria.target_audience,
+            "detail": criteria.detail,
+            "abstraction": criteria.abstraction,
+            "field": criteria.field,
+            "subject": val_info.chosen_subject,
+            "question_age": val_info.question_age,
+            "answer": answer,
+            "score": score,
+            "latency": latency,
+            "duplicate_of": duplicate_of,
+            "embedding": embedding,
+        })
+
+    def flush(self) -> None:
+        """Writes the buffered rows as a new part of the current cycle."""
+        if not self._rows:
+            return
+        # taken first, rows added while writing go to the next part
+        rows, self._rows = self._rows, []
+        part = self._part
+        self._part += 1
+        date = datetime.fromtimestamp(self._cycle, timezone.utc).strftime("%Y-%m-%d")
+        directory = os.path.join(self.root, f"date={date}")
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"{self._cycle}-{part}.parquet")
+        frame = pl.DataFrame(rows, schema=ANSWER_SCHEMA)
+        # written under a temporary name, so scans never see half a file
+        frame.write_parquet(f"{path}.tmp", compression="zstd")
+        os.replace(f"{path}.tmp", path)
+        log(f"Wrote {len(rows)} scored answers to {path}")
+
+    def prune(self) -> None:
+        """Deletes the dates older than `retention_days`, if it's set."""
+        if not self.retention_days or not os.path.isdir(self.root):
+            return
+        oldest = datetime.now(timezone.utc) - timedelta(days=self.retention_days)
+        for name in os.listdir(self.root):
+            # the names sort like the dates they hold
+            if name.startswith("date=") and name < f"date={oldest:%Y-%m-%d}":
+                shutil.rmtree(os.path.join(self.root, name), ignore_errors=True)
+                log(f"Deleted the scored answers of {name[len('date='):]}")
+
+
+def scan_answers(root: str) -> pl.LazyFrame:
+    """Lazily scans an answer journal, with its `date` partition column."""
+    root = os.path.expanduser(root)
+    return pl.scan_parquet(
+        os.path.join(root, "**", "*.parquet"), hive_partitioning=True
+    )
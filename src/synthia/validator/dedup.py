@@ -0,0 +1,126 @@
+import re
+import zlib
+from collections import defaultdict
+
+import numpy as np
+import numpy.typing as npt
+from fuzzywuzzy import fuzz  # type: ignore
+
+# largest prime below 2**32, so `a * hash + b` never overflows 64 bits
+_MINHASH_PRIME = (1 << 32) - 5
+_WORD_REGEX = re.compile(r"\w+")
+
+
+def shingles(text: str, size: int) -> set[int]:
+    """Hashes of the word n-grams of the text, ignoring case and punctuation."""
+    words = _WORD_REGEX.findall(text.lower())
+    if len(words) < size:
+        return {zlib.crc32(" ".join(words).encode())}
+    return {
+        zlib.crc32(" ".join(words[i:i + size]).encode())
+        for i in range(len(words) - size + 1)
+    }
+
+
+class NearDuplicateIndex:
+    """Finds near-duplicate texts in roughly linear time.
+
+    Each text gets a MinHash signature of its word shingles. The signature is
+    cut into `bands` bands, and texts sharing any band are candidate
+    duplicates. Only the candidates are compared with `fuzz.ratio`, and they
+    are confirmed when the ratio is at least `min_ratio`.
+
+    With the defaults (128 permutations in 32 bands), texts with a shingle
+    Jaccard similarity above ~0.4 are very likely to become candidates.
+    """
+
+    def __init__(
+        self,
+        num_perm: int = 128,
+        bands: int = 32,
+        shingle_size: int = 3,
+        min_ratio: int = 90,
+        seed: int = 42,
+    ) -> None:
+        assert num_perm % bands == 0
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+        self.min_ratio = min_ratio
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(1, _MINHASH_PRIME, size=(num_perm, 1), dtype=np.uint64)
+        self._b = rng.integers(0, _MINHASH_PRIME, size=(num_perm, 1), dtype=np.uint64)
+        self._buckets: list[dict[bytes, list[int]]] = [{} for _ in range(bands)]
+        self._texts: dict[int, str] = {}
+        self._parent: dict[int, int] = {}
+
+    def signature(self, text: str) -> npt.NDArray[np.uint64]:
+        hashes = np.fromiter(
+            shingles(text, self.shingle_size), dtype=np.uint64
+        ).reshape(1, -1)
+        permuted = (self._a * hashes + self._b) % _MINHASH_PRIME
+        return permuted.min(axis=1)
+
+    def _find(self, key: int) -> int:
+        while self._parent[key] != key:
+            self._parent[key] = self._parent[self._parent[key]]
+            key = self._parent[key]
+        return key
+
+    def _union(self, key_a: int, key_b: int) -> None:
+        root_a, root_b = self._find(key_a), self._find(key_b)
+        if root_a != root_b:
+            self._parent[max(root_a, root_b)] = min(root_a, root_b)
+
+    def add(self, key: int, text: str) -> list[int]:
+        """Indexes the text under `key`.
+
+        Returns:
+            The keys of the previously added texts confirmed as its duplicates.
+        """
+        assert key not in self._texts
+        signature = self.signature(text)
+        candidates: set[int] = set()
+        for band, buckets in enumerate(self._buckets):
+            band_key = signature[band * self.rows:(band + 1) * self.rows].tobytes()
+            bucket = buckets.setdefault(band_key, [])
+            candidates.update(bucket)
+            bucket.append(key)
+
+        self._texts[key] = text
+        self._parent[key] = key
+        duplicates: list[int] = []
+        for candidate in candidates:
+            ratio: int = fuzz.ratio(self._texts[candidate], text)  # type: ignore
+            if ratio >= self.min_ratio:
+                duplicates.append(candidate)
+                self._union(candidate, key)
+        return duplicates
+
+    def groups(self) -> dict[int, list[int]]:
+        """Maps each key that has duplicates to the sorted keys of its group,
+        itself included. Keys without duplicates are left out."""
+        members: defaultdict[int, list[int]] = defaultdict(list)
+        for key in self._texts:
+            members[self._find(key)].append(key)
+        return {
+            key: sorted(group)
+            for group in members.values() if len(group) > 1
+            for key in group
+        }
+
+
+def find_duplicate_groups(
+    answers: dict[int, str], index: NearDuplicateIndex | None = None
+) -> dict[int, list[int]]:
+    """Groups the uids whose answers are near duplicates of each other.
+
+    Returns:
+        A dictionary mapping each uid with duplicates to the sorted uids of
+        its group, itself included.
+    """
+    index = index or NearDuplicateIndex()
+    for uid, answer in answers.items():
+        index.add(uid, answer)
+    return index.groups()
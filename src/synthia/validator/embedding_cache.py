@@ -0,0 +1,258 @@
+import asyncio
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+from ..utils import log
+from ._config import ValidatorSettings
+from .similarity import AsyncEmbedder, Embedder
+
+CacheKey = tuple[str, bytes]
+
+
+def text_digest(text: str) -> bytes:
+    return hashlib.sha256(text.encode("utf-8")).digest()
+
+
+class EmbeddingCache:
+    """Content-addressed store of embeddings, keyed by (model, SHA-256 of the text).
+
+    Recently used embeddings are kept in an in-memory LRU, in front of a
+    SQLite database holding up to `max_entries` float32 vectors. When the
+    database grows past that, the least recently used rows are evicted. The
+    memory tier is warmed from the database on startup, so a restarted
+    validator serves hits right away.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        max_entries: int = 200_000,
+        memory_entries: int = 10_000,
+    ) -> None:
+        assert max_entries > 0 and memory_entries >= 0
+        self.path = os.path.expanduser(path)
+        self.max_entries = max_entries
+        self.memory_entries = memory_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self._memory: OrderedDict[CacheKey, list[float]] = OrderedDict()
+        # the sync embedders run on a thread pool, so the connection is shared
+        self._lock = threading.Lock()
+        if self.path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._db = sqlite3.connect(self.path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            " model TEXT NOT NULL,"
+            " digest BLOB NOT NULL,"
+            " vector BLOB NOT NULL,"
+            " last_used REAL NOT NULL,"
+            " PRIMARY KEY (model, digest))"
+        )
+        self._db.execute(
+            "CREATE INDEX IF NOT EXISTS embeddings_last_used ON embeddings (last_used)"
+        )
+        self._db.commit()
+        self._warm_up()
+
+    @classmethod
+    def from_settings(cls, settings: ValidatorSettings) -> "EmbeddingCache":
+        return cls(
+            settings.embedding_cache_path,
+            max_entries=settings.embedding_cache_max_entries,
+            memory_entries=settings.embedding_cache_memory_entries,
+        )
+
+    def _warm_up(self) -> None:
+        rows = self._db.execute(
+            "SELECT model, digest, vector FROM embeddings"
+            " ORDER BY last_used DESC LIMIT ?",
+            (self.memory_entries,),
+        ).fetchall()
+        # oldest first, so the most recent end up at the top of the LRU
+        for model, digest, vector in reversed(rows):
+            self._memory[(model, digest)] = _decode(vector)
+
+    def _remember(self, key: CacheKey, embedding: list[float]) -> None:
+        self._memory[key] = embedding
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def get_many(self, model: str, texts: list[str]) -> list[list[float] | None]:
+        """Looks up the embeddings of the texts.
+
+        Returns:
+            The cached embeddings in the same order as the texts, with None
+            for the ones not in the cache.
+        """
+        keys = [(model, text_digest(text)) for text in texts]
+        results: list[list[float] | None] = [None] * len(keys)
+        now = time.time()
+        with self._lock:
+            on_disk: list[int] = []
+            for i, key in enumerate(keys):
+                embedding = self._memory.get(key)
+                if embedding is None:
+                    on_disk.append(i)
+                    continue
+                self._memory.move_to_end(key)
+                results[i] = embedding
+
+            for i in on_disk:
+                row = self._db.execute(
+                    "SELECT vector FROM embeddings WHERE model = ? AND digest = ?",
+                    keys[i],
+                ).fetchone()
+                if row is None:
+                    continue
+                embedding = _decode(row[0])
+                self._remember(keys[i], embedding)
+                results[i] = embedding
+
+            touched = [
+                (now, *key) for key, result in zip(keys, results) if result is not None
+            ]
+            self._db.executemany(
+                "UPDATE embeddings SET last_used = ? WHERE model = ? AND digest = ?",
+                touched,
+            )
+            self._db.commit()
+
+            found = sum(result is not None for result in results)
+            self.hits += found
+            self.misses += len(results) - found
+        return results
+
+    def put_many(
+        self, model: str, texts: list[str], embeddings: list[list[float]]
+    ) -> None:
+        assert len(texts) == len(embeddings)
+        now = time.time()
+        rows: list[tuple[str, bytes, bytes, float]] = []
+        with self._lock:
+            for text, embedding in zip(texts, embeddings):
+                key = (model, text_digest(text))
+                self._remember(key, embedding)
+                rows.append((*key, _encode(embedding), now))
+            self._db.executemany(
+                "INSERT OR REPLACE INTO embeddings (model, digest, vector, last_used)"
+                " VALUES (?, ?, ?, ?)",
+                rows,
+            )
+            self._evict()
+            self._db.commit()
+
+    def _evict(self) -> None:
+        (count,) = self._db.execute("SELECT COUNT(*) FROM embeddings").fetchone()
+        excess = count - self.max_entries
+        if excess <= 0:
+            return
+        self._db.execute(
+            "DELETE FROM embeddings WHERE rowid IN"
+            " (SELECT rowid FROM embeddings ORDER BY last_used LIMIT ?)",
+            (excess,),
+        )
+        self.evictions += excess
+
+    def report(self, texts: int, misses: int) -> None:
+        """Logs how much of a batch of texts had to be embedded."""
+        if texts > 1:
+            log(
+                f"Embedding cache: embedded {misses} new texts out of "
+                f"{texts}, totals {self.stats()}"
+            )
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "memory_entries": len(self._memory),
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+
+def _encode(embedding: list[float]) -> bytes:
+    return np.asarray(embedding, dtype=np.float32).tobytes()
+
+
+def _decode(blob: bytes) -> list[float]:
+    return np.frombuffer(blob, dtype=np.float32).tolist()
+
+
+def _unique_misses(
+    texts: list[str], cached: list[list[float] | None]
+) -> list[str]:
+    # identical answers in the same batch are only embedded once
+    return list(dict.fromkeys(
+        text for text, embedding in zip(texts, cached) if embedding is None
+    ))
+
+
+def _merge(
+    texts: list[str],
+    cached: list[list[float] | None],
+    misses: list[str],
+    embedded: list[list[float]],
+) -> list[list[float]]:
+    by_text = dict(zip(misses, embedded))
+    return [
+        embedding if embedding is not None else by_text[text]
+        for text, embedding in zip(texts, cached)
+    ]
+
+
+class CachedEmbedder(Embedder):
+    """Wraps an `Embedder`, only embedding the texts missing from the cache."""
+
+    def __init__(self, embedder: Embedder, cache: EmbeddingCache, model: str | None = None):
+        self.embedder = embedder
+        self.cache = cache
+        self.model: str = model or getattr(embedder, "model")
+
+    def get_embedding(self, input: str) -> list[float]:
+        return self.get_embeddings([input])[0]
+
+    def get_embeddings(self, inputs: list[str]) -> list[list[float]]:
+        cached = self.cache.get_many(self.model, inputs)
+        misses = _unique_misses(inputs, cached)
+        embedded = self.embedder.get_embeddings(misses) if misses else []
+        self.cache.put_many(self.model, misses, embedded)
+        self.cache.report(len(inputs), len(misses))
+        return _merge(inputs, cached, misses, embedded)
+
+
+class AsyncCachedEmbedder(AsyncEmbedder):
+    """Wraps an `AsyncEmbedder`, only embedding the texts missing from the cache."""
+
+    def __init__(
+        self, embedder: AsyncEmbedder, cache: EmbeddingCache, model: str | None = None
+    ):
+        self.embedder = embedder
+        self.cache = cache
+        self.model: str = model or getattr(embedder, "model")
+
+    async def get_embedding(self, input: str) -> list[float]:
+        return (await self.get_embeddings([input]))[0]
+
+    async def get_embeddings(self, inputs: list[str]) -> list[list[float]]:
+        # the cache reads and writes SQLite, which would block the event loop
+        cached = await asyncio.to_thread(self.cache.get_many, self.model, inputs)
+        misses = _unique_misses(inputs, cached)
+        embedded = await self.embedder.get_embeddings(misses) if misses else []
+        await asyncio.to_thread(self.cache.put_many, self.model, misses, embedded)
+        self.cache.report(len(inputs), len(misses))
+        return _merge(inputs, cached, misses, embedded)
@@ -1,7 +1,18 @@
+from dataclasses import dataclass
 from typing import cast
 
 from ..miner.BaseLLM import BaseLLM
-from .meta_prompt import explanation_prompt
+from .meta_prompt import Criteria, explanation_prompt
+
+
+@dataclass
+class ValidationDataset:
+    prompt: str
+    val_answer: str
+    criteria: Criteria
+    question_age: float
+    chosen_subject: str
+    embedded_val_answer: list[float]
 
 
 class InputGenerator:
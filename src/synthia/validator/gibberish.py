@@ -0,0 +1,123 @@
+import asyncio
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any
+
+from transformers import Pipeline  # type: ignore
+
+from ..utils import log
+from ._config import ValidatorSettings
+from .similarity import get_classifier
+
+
+class GibberishFilter:
+    """Flags gibberish answers before they are embedded.
+
+    The shared classifier pipeline of `similarity.get_classifier` is loaded
+    on first use. Texts are
+    sorted by length and classified in padded, truncated batches, so short
+    answers don't pay for the padding of long ones. Verdicts are cached by
+    the hash of the text, so answers seen before aren't classified again.
+
+    If the pipeline can't be loaded, every text is accepted.
+
+    Args:
+        accepted_labels: Labels of the texts that pass the filter.
+        batch_size: Maximum amount of texts in a forward pass.
+        max_length: Texts are truncated to this many tokens.
+        cache_size: Amount of verdicts kept.
+        classifier: Pipeline to classify with, instead of the shared one.
+    """
+
+    def __init__(
+        self,
+        accepted_labels: tuple[str, ...] = ("clean",),
+        batch_size: int = 32,
+        max_length: int = 512,
+        cache_size: int = 50_000,
+        classifier: Pipeline | None = None,
+    ) -> None:
+        assert batch_size > 0
+        self.accepted_labels = accepted_labels
+        self.batch_size = batch_size
+        self.max_length = max_length
+        self.cache_size = cache_size
+        self._classifier = classifier
+        self._load_failed = False
+        self._verdicts: OrderedDict[bytes, bool] = OrderedDict()
+        # pipelines aren't thread safe, and classifying runs in worker threads
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.rejected = 0
+
+    @classmethod
+    def from_settings(cls, settings: ValidatorSettings) -> "GibberishFilter":
+        return cls(
+            batch_size=settings.gibberish_batch_size,
+            max_length=settings.gibberish_max_length,
+        )
+
+    def load(self) -> Pipeline | None:
+        """Loads the classifier if it isn't yet, None if it can't be."""
+        if self._classifier is None and not self._load_failed:
+            try:
+                self._classifier = get_classifier()
+            except Exception as e:
+                self._load_failed = True
+                log(f"WARN: Could not load the gibberish classifier, accepting every answer: {e}")
+        return self._classifier
+
+    def _classify(self, classifier: Pipeline, texts: list[str]) -> list[str]:
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+        results: Any = classifier(
+            [texts[i] for i in order],
+            batch_size=self.batch_size,
+            truncation=True,
+            padding=True,
+            max_length=self.max_length,
+        )
+        labels = [""] * len(texts)
+        for i, result in zip(order, results):
+            labels[i] = result["label"]
+        return labels
+
+    def classify(self, texts: list[str]) -> list[bool]:
+        """Whether each text passes the filter."""
+        digests = [hashlib.sha256(text.encode()).digest() for text in texts]
+        with self._lock:
+            # the verdicts of this batch, the cache may evict some of them
+            found: dict[bytes, bool] = {}
+            missing: dict[bytes, str] = {}
+            for digest, text in zip(digests, texts):
+                if digest in found or digest in missing:
+                    continue
+                verdict = self._verdicts.get(digest)
+                if verdict is not None:
+                    self.hits += 1
+                    self._verdicts.move_to_end(digest)
+                    found[digest] = verdict
+                else:
+                    self.misses += 1
+                    missing[digest] = text
+            if missing:
+                classifier = self.load()
+                if classifier is None:
+                    return [True] * len(texts)
+                labels = self._classify(classifier, list(missing.values()))
+                for digest, label in zip(missing, labels):
+                    found[digest] = label in self.accepted_labels
+                    self._verdicts[digest] = found[digest]
+                while len(self._verdicts) > self.cache_size:
+                    self._verdicts.popitem(last=False)
+            verdicts = [found[digest] for digest in digests]
+        self.rejected += verdicts.count(False)
+        return verdicts
+
+    async def aclassify(self, texts: list[str]) -> list[bool]:
+        # the model is CPU bound, and would block the event loop
+        return await asyncio.to_thread(self.classify, texts)
+
+    def stats(self) -> dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses, "rejected": self.rejected}
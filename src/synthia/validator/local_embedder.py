@@ -0,0 +1,92 @@
+import threading
+from typing import Any, Literal
+
+from transformers import AutoModel, AutoTokenizer  # type: ignore
+
+from .similarity import Embedder
+
+
+class LocalTransformerEmbedder(Embedder):
+    """Embeds texts on the CPU with a local sentence-embedding model.
+
+    The model is loaded once. Texts are sorted by length and tokenized in
+    padded batches of similar lengths, so short answers don't pay for the
+    padding of long ones. Requires `torch`.
+
+    Args:
+        model: Name of the model on the HuggingFace hub.
+        batch_size: Maximum amount of texts in a forward pass.
+        max_length: Texts are truncated to this many tokens.
+        num_threads: Threads used by torch for intra-op parallelism. Uses the
+            torch default if None.
+        pooling: "cls" to take the first token state, "mean" to average the
+            token states over the attention mask.
+    """
+
+    def __init__(
+        self,
+        model: str = "BAAI/bge-small-en-v1.5",
+        batch_size: int = 16,
+        max_length: int = 512,
+        num_threads: int | None = None,
+        pooling: Literal["cls", "mean"] = "cls",
+    ) -> None:
+        try:
+            import torch
+        except ImportError as e:
+            raise ImportError(
+                "LocalTransformerEmbedder requires torch, install it with "
+                "`pip install torch`"
+            ) from e
+
+        assert batch_size > 0
+        self.torch = torch
+        self.model = model
+        self.batch_size = batch_size
+        self.max_length = max_length
+        self.pooling = pooling
+        if num_threads is not None:
+            torch.set_num_threads(num_threads)
+        self.tokenizer: Any = AutoTokenizer.from_pretrained(model)
+        self.encoder: Any = AutoModel.from_pretrained(model)
+        self.encoder.eval()
+        # torch already parallelizes each forward pass, running several at
+        # once from the embedder thread pool only oversubscribes the cores
+        self._lock = threading.Lock()
+
+    def _embed_batch(self, texts: list[str]) -> list[list[float]]:
+        torch = self.torch
+        tokens = self.tokenizer(
+            texts,
+            padding=True,
+            truncation=True,
+            max_length=self.max_length,
+            return_tensors="pt",
+        )
+        with torch.inference_mode():
+            hidden = self.encoder(**tokens).last_hidden_state
+            match self.pooling:
+                case "cls":
+                    pooled = hidden[:, 0]
+                case "mean":
+                    mask = tokens["attention_mask"].unsqueeze(-1).to(hidden.dtype)
+                    pooled = (hidden * mask).sum(dim=1) / mask.sum(dim=1).clamp(min=1)
+                case _:
+                    raise ValueError(f"unknown pooling {self.pooling!r}")
+            pooled = torch.nn.functional.normalize(pooled, p=2, dim=1)
+        return pooled.tolist()
+
+    def get_embedding(self, input: str) -> list[float]:
+        return self.get_embeddings([input])[0]
+
+    def get_embeddings(self, inputs: list[str]) -> list[list[float]]:
+        # length bucketing: batches of neighbours in length need little padding
+        order = sorted(range(len(inputs)), key=lambda i: len(inputs[i]))
+        embeddings: list[list[float]] = [[] for _ in inputs]
+        with self._lock:
+            for start in range(0, len(order), self.batch_size):
+                batch = order[start:start + self.batch_size]
+                batch_embeddings = self._embed_batch([inputs[i] for i in batch])
+                for i, embedding in zip(batch, batch_embeddings):
+                    embeddings[i] = embedding
+        return embeddings
@@ -0,0 +1,144 @@
+import asyncio
+import json
+import os
+import re
+import time
+from dataclasses import asdict, dataclass
+from typing import Any
+
+from communex.client import CommuneClient  # type: ignore
+from communex.types import Ss58Address  # type: ignore
+
+from ..utils import log
+from ._config import ValidatorSettings
+
+# TODO: make it match ipv6
+IP_REGEX = re.compile(r"\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3}:\d+")
+
+
+def extract_address(string: str):
+    """
+    Extracts an address from a string.
+    """
+    return re.search(IP_REGEX, string)
+
+
+def get_ip_port(modules_adresses: dict[int, str]):
+    filtered_addr = {id: extract_address(addr)
+                     for id, addr in modules_adresses.items()}
+    ip_port = {
+        id: x.group(0).split(":") for id, x in filtered_addr.items() if x is not None
+    }
+    return ip_port
+
+
+def get_current_block(client: CommuneClient) -> int:
+    block = client.get_block()
+    assert block is not None
+    return int(block["header"]["number"])
+
+
+@dataclass
+class MetagraphSnapshot:
+    netuid: int
+    block: int
+    # the key of every registered uid
+    keys: dict[int, Ss58Address]
+    # (ip, port) of the uids with a parsable address
+    addresses: dict[int, tuple[str, int]]
+    # blocks after which the weights of a validator expire, if known
+    max_weight_age: int | None = None
+
+
+class MetagraphCache:
+    """Caches the addresses and keys of the modules in a subnet.
+
+    The two maps are only queried again once the chain is
+    `refresh_blocks` blocks past the block they were read at, and are then
+    fetched concurrently. The snapshot is persisted, so a restarted validator
+    starts from it instead of querying the whole subnet.
+    """
+
+    def __init__(self, netuid: int, path: str | None, refresh_blocks: int = 720) -> None:
+        self.netuid = netuid
+        self.path = os.path.expanduser(path) if path else None
+        self.refresh_blocks = refresh_blocks
+        self.snapshot: MetagraphSnapshot | None = None
+        self.load()
+
+    @classmethod
+    def from_settings(cls, netuid: int, settings: ValidatorSettings) -> "MetagraphCache":
+        return cls(
+            netuid,
+            settings.metagraph_cache_path or None,
+            refresh_blocks=settings.metagraph_refresh_blocks,
+        )
+
+    def is_stale(self, current_block: int) -> bool:
+        return (
+            self.snapshot is None
+            or current_block - self.snapshot.block >= self.refresh_blocks
+        )
+
+    async def get(
+        self, client: CommuneClient, force_refresh: bool = False
+    ) -> MetagraphSnapshot:
+        """Returns the cached snapshot, refreshing it first if it's stale."""
+        current_block = await asyncio.to_thread(get_current_block, client)
+        if force_refresh or self.is_stale(current_block):
+            await self.refresh(client, current_block)
+        assert self.snapshot is not None
+        return self.snapshot
+
+    async def refresh(self, client: CommuneClient, block: int) -> MetagraphSnapshot:
+        start = time.monotonic()
+        # the client is blocking, so the queries run on the thread pool
+        modules_adresses, modules_keys, max_weight_age = await asyncio.gather(
+            asyncio.to_thread(client.query_map_address, self.netuid),
+            asyncio.to_thread(client.query_map_key, self.netuid),
+            asyncio.to_thread(client.query, "MaxWeightAge", [self.netuid]),
+        )
+        addresses = {
+            uid: (ip, int(port))
+            for uid, (ip, port) in get_ip_port(modules_adresses).items()
+        }
+        self.snapshot = MetagraphSnapshot(
+            self.netuid, block, modules_keys, addresses, max_weight_age
+        )
+        log(
+            f"Refreshed the metagraph at block {block} with {len(modules_keys)} "
+            f"modules in {time.monotonic() - start:.1f}s"
+        )
+        self.save()
+        return self.snapshot
+
+    def load(self) -> None:
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path) as file:
+                record: dict[str, Any] = json.load(file)
+            snapshot = MetagraphSnapshot(
+                netuid=record["netuid"],
+                block=record["block"],
+                keys={int(uid): key for uid, key in record["keys"].items()},
+                addresses={
+                    int(uid): (ip, port)
+                    for uid, (ip, port) in record["addresses"].items()
+                },
+                max_weight_age=record.get("max_weight_age"),
+            )
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            log(f"WARN: Could not load the metagraph from {self.path}: {e}")
+            return
+        if snapshot.netuid == self.netuid:
+            self.snapshot = snapshot
+
+    def save(self) -> None:
+        if not self.path or self.snapshot is None:
+            return
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as file:
+            json.dump(asdict(self.snapshot), file)
+        os.replace(tmp_path, self.path)
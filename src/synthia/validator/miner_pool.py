@@ -0,0 +1,199 @@
+import asyncio
+import json
+import time
+from types import SimpleNamespace
+from typing import Any
+
+import aiohttp
+from communex.errors import NetworkTimeoutError  # type: ignore
+from communex.module._protocol import (create_method_endpoint,  # type: ignore
+                                       create_request_data)
+from communex.module.client import ModuleClient  # type: ignore
+from communex.types import Ss58Address  # type: ignore
+from substrateinterface import Keypair  # type: ignore
+
+from ._config import ValidatorSettings
+
+MinerKey = tuple[str, int, Ss58Address]
+
+
+class PooledModuleClient(ModuleClient):
+    """`ModuleClient` that sends its requests through the shared session of a
+    `MinerConnectionPool`, instead of opening a new session per call."""
+
+    def __init__(
+        self, host: str, port: int, key: Keypair, pool: "MinerConnectionPool"
+    ):
+        super().__init__(host, port, key)
+        self.pool = pool
+
+    async def call(
+        self,
+        fn: str,
+        target_key: Ss58Address,
+        params: Any = {},
+        timeout: int = 16,
+    ) -> Any:
+        serialized_data, headers = create_request_data(self.key, target_key, params)
+        session = self.pool.get_session()
+        try:
+            async with session.post(
+                create_method_endpoint(self.host, self.port, fn),
+                json=json.loads(serialized_data),
+                headers=headers,
+                timeout=aiohttp.ClientTimeout(total=timeout),
+            ) as response:
+                match response.status:
+                    case 200:
+                        pass
+                    case status_code:
+                        response_j = await response.json()
+                        raise Exception(
+                            f"Unexpected status code: {status_code}, response: {response_j}")
+                match response.content_type:
+                    case 'application/json':
+                        return await asyncio.wait_for(response.json(), timeout=timeout)
+                    case _:
+                        raise Exception(
+                            f"Unknown content type: {response.content_type}")
+        except asyncio.TimeoutError as e:
+            raise NetworkTimeoutError(
+                f"The call took longer than the timeout of {timeout} second(s)"
+            ).with_traceback(e.__traceback__)
+
+
+class MinerConnectionPool:
+    """Reuses miner clients and their keep-alive HTTP connections.
+
+    Clients are keyed by (ip, port, ss58) and share one `aiohttp` session,
+    whose connector caps the connections per host and closes sockets idle
+    for longer than `idle_timeout`. `sync` drops the clients of miners that
+    moved to another address or left the subnet.
+
+    Note that miners close idle connections on their side as well (after 5
+    seconds with the default uvicorn settings), which bounds how long a
+    socket can actually be reused.
+    """
+
+    def __init__(
+        self,
+        key: Keypair,
+        limit: int = 512,
+        limit_per_host: int = 4,
+        idle_timeout: float = 60,
+    ) -> None:
+        self.key = key
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.idle_timeout = idle_timeout
+        self._clients: dict[MinerKey, PooledModuleClient] = {}
+        self._uid_keys: dict[int, MinerKey] = {}
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._session: aiohttp.ClientSession | None = None
+        self.client_hits = 0
+        self.client_misses = 0
+        self.invalidations = 0
+        self.connections_created = 0
+        self.connections_reused = 0
+        self.connect_time = 0.0
+
+    @classmethod
+    def from_settings(cls, key: Keypair, settings: ValidatorSettings) -> "MinerConnectionPool":
+        return cls(
+            key,
+            limit=settings.miner_pool_limit,
+            limit_per_host=settings.miner_pool_limit_per_host,
+            idle_timeout=settings.miner_pool_idle_timeout,
+        )
+
+    def _trace_config(self) -> aiohttp.TraceConfig:
+        trace_config = aiohttp.TraceConfig()
+
+        async def on_create_start(
+            _session: aiohttp.ClientSession, context: SimpleNamespace, _params: Any
+        ) -> None:
+            context.connect_start = time.perf_counter()
+
+        async def on_create_end(
+            _session: aiohttp.ClientSession, context: SimpleNamespace, _params: Any
+        ) -> None:
+            self.connections_created += 1
+            self.connect_time += time.perf_counter() - context.connect_start
+
+        async def on_reuse(
+            _session: aiohttp.ClientSession, _context: SimpleNamespace, _params: Any
+        ) -> None:
+            self.connections_reused += 1
+
+        trace_config.on_connection_create_start.append(on_create_start)
+        trace_config.on_connection_create_end.append(on_create_end)
+        trace_config.on_connection_reuseconn.append(on_reuse)
+        return trace_config
+
+    def get_session(self) -> aiohttp.ClientSession:
+        # sessions are bound to the event loop they are created in
+        loop = asyncio.get_running_loop()
+        if self._session is None or self._session.closed or self._loop is not loop:
+            connector = aiohttp.TCPConnector(
+                limit=self.limit,
+                limit_per_host=self.limit_per_host,
+                keepalive_timeout=self.idle_timeout,
+            )
+            self._loop = loop
+            self._session = aiohttp.ClientSession(
+                connector=connector, trace_configs=[self._trace_config()]
+            )
+        return self._session
+
+    def get_client(self, ip: str, port: int, ss58: Ss58Address) -> PooledModuleClient:
+        miner_key = (ip, port, ss58)
+        client = self._clients.get(miner_key)
+        if client is None:
+            self.client_misses += 1
+            client = PooledModuleClient(ip, port, self.key, self)
+            self._clients[miner_key] = client
+        else:
+            self.client_hits += 1
+        return client
+
+    def sync(self, modules: dict[int, MinerKey]) -> None:
+        """Drops the clients of miners whose address or key changed on chain,
+        or that deregistered.
+
+        Args:
+            modules: The current (ip, port, ss58) of each uid.
+        """
+        for uid, miner_key in self._uid_keys.items():
+            if modules.get(uid) != miner_key and self._clients.pop(miner_key, None):
+                self.invalidations += 1
+        self._uid_keys = dict(modules)
+        current = set(modules.values())
+        for miner_key in list(self._clients):
+            if miner_key not in current:
+                del self._clients[miner_key]
+
+    def open_sockets(self) -> int:
+        if self._session is None or self._session.closed:
+            return 0
+        connector: Any = self._session.connector
+        # aiohttp doesn't expose these counts publicly
+        idle = sum(len(conns) for conns in getattr(connector, "_conns", {}).values())
+        return idle + len(getattr(connector, "_acquired", ()))
+
+    def stats(self) -> dict[str, float]:
+        created = self.connections_created
+        return {
+            "clients": len(self._clients),
+            "client_hits": self.client_hits,
+            "client_misses": self.client_misses,
+            "invalidations": self.invalidations,
+            "open_sockets": self.open_sockets(),
+            "connections_created": created,
+            "connections_reused": self.connections_reused,
+            "avg_connect_ms": 1000 * self.connect_time / created if created else 0.0,
+        }
+
+    async def close(self) -> None:
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
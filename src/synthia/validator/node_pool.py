@@ -0,0 +1,273 @@
+import asyncio
+import random
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Generator, TypeVar
+
+from communex._common import get_available_nodes  # type: ignore
+from communex.client import CommuneClient  # type: ignore
+
+from ..utils import log
+from ._config import ValidatorSettings
+from .metagraph import get_current_block
+
+T = TypeVar("T")
+
+
+class NoHealthyNodeError(Exception):
+    pass
+
+
+@dataclass
+class NodeState:
+    url: str
+    client: CommuneClient | None = None
+    # exponentially weighted moving average of the probe latency, in seconds
+    latency: float | None = None
+    block: int | None = None
+    consecutive_failures: int = 0
+    # how many times in a row the circuit was opened, drives the backoff
+    trips: int = 0
+    open_until: float = 0
+    last_probe: float = field(default=0)
+
+    def is_open(self, now: float) -> bool:
+        return now < self.open_until
+
+
+class NodePool:
+    """Routes chain queries and extrinsics to the fastest healthy node.
+
+    Up to `size` nodes are kept connected. They are probed every
+    `probe_interval` seconds for latency and block height. Queries go to the
+    lowest latency node that is at most `max_block_lag` blocks behind the
+    highest block seen.
+
+    After `failure_threshold` consecutive failures, a node's circuit opens.
+    It is skipped for an exponentially growing backoff, between
+    `base_backoff` and `max_backoff` seconds, and its slot goes to another
+    node from the list. Once the backoff passes, the node gets one trial
+    request. A success closes the circuit, and a failure opens it again.
+    Nodes with failures below the threshold are still used, but only when
+    no node without failures is available.
+
+    Args:
+        client_factory: Builds the client of a node url. Can be replaced,
+            e.g. to point the pool at local stub servers in tests.
+        probe: Returns the current block of a client.
+    """
+
+    def __init__(
+        self,
+        urls: list[str],
+        size: int = 3,
+        probe_interval: float = 60,
+        failure_threshold: int = 3,
+        base_backoff: float = 5,
+        max_backoff: float = 300,
+        max_block_lag: int = 3,
+        client_factory: Callable[[str], CommuneClient] | None = None,
+        probe: Callable[[CommuneClient], int] = get_current_block,
+    ) -> None:
+        assert urls and size > 0 and failure_threshold > 0
+        self.size = size
+        self.probe_interval = probe_interval
+        self.failure_threshold = failure_threshold
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.max_block_lag = max_block_lag
+        self.client_factory = client_factory or (
+            # two connections per node, so independent queries can overlap
+            lambda url: CommuneClient(url, num_connections=2)
+        )
+        self._probe = probe
+        shuffled = random.sample(urls, len(urls))
+        self.nodes = [NodeState(url) for url in shuffled]
+        self._lock = threading.Lock()
+        self._last_probe = 0.0
+
+    @classmethod
+    def from_settings(
+        cls, settings: ValidatorSettings, use_testnet: bool = False
+    ) -> "NodePool":
+        return cls(
+            get_available_nodes(use_testnet=use_testnet),
+            size=settings.node_pool_size,
+            probe_interval=settings.node_probe_interval,
+            failure_threshold=settings.node_failure_threshold,
+            max_backoff=settings.node_max_backoff,
+        )
+
+    def _connect(self, node: NodeState) -> bool:
+        try:
+            node.client = self.client_factory(node.url)
+            return True
+        except Exception as e:
+            log(f"WARN: Could not connect to node {node.url}: {e}")
+            self._trip(node, time.time())
+            return False
+
+    def _trip(self, node: NodeState, now: float) -> None:
+        node.trips += 1
+        backoff = min(self.base_backoff * 2 ** (node.trips - 1), self.max_backoff)
+        node.open_until = now + backoff
+        node.consecutive_failures = 0
+        node.client = None
+        log(f"Node {node.url} is unhealthy, skipping it for {backoff:.0f}s")
+
+    def _fill(self, now: float) -> None:
+        """Connects nodes until `size` healthy ones are connected."""
+        connected = [
+            node for node in self.nodes
+            if node.client is not None and not node.is_open(now)
+        ]
+        for node in self.nodes:
+            if len(connected) >= self.size:
+                break
+            if node.client is None and not node.is_open(now) and self._connect(node):
+                connected.append(node)
+
+    def probe(self) -> None:
+        """Measures the latency and block height of the connected nodes."""
+        with self._lock:
+            now = time.time()
+            self._fill(now)
+            nodes = [n for n in self.nodes if n.client is not None]
+            self._last_probe = now
+        for node in nodes:
+            client = node.client
+            if client is None:
+                continue
+            start = time.perf_counter()
+            try:
+                block = self._probe(client)
+            except Exception as e:
+                log(f"WARN: Probe of node {node.url} failed: {e}")
+                self._record_failure(node)
+                continue
+            latency = time.perf_counter() - start
+            with self._lock:
+                node.block = block
+                node.latency = (
+                    latency if node.latency is None else 0.7 * node.latency + 0.3 * latency
+                )
+                node.last_probe = now
+            self._record_success(node)
+
+    def _record_success(self, node: NodeState) -> None:
+        with self._lock:
+            node.consecutive_failures = 0
+            node.trips = 0
+
+    def _record_failure(self, node: NodeState) -> None:
+        with self._lock:
+            node.consecutive_failures += 1
+            half_open = node.trips > 0
+            if half_open or node.consecutive_failures >= self.failure_threshold:
+                self._trip(node, time.time())
+
+    def _ranked(self) -> list[NodeState]:
+        """Healthy connected nodes, best first."""
+        if time.time() - self._last_probe >= self.probe_interval:
+            self.probe()
+        with self._lock:
+            now = time.time()
+            self._fill(now)
+            healthy = [
+                node for node in self.nodes
+                if node.client is not None and not node.is_open(now)
+            ]
+            blocks = [node.block for node in healthy if node.block is not None]
+            if blocks:
+                top = max(blocks)
+                in_sync = [
+                    node for node in healthy
+                    if node.block is not None and top - node.block <= self.max_block_lag
+                ]
+                healthy = in_sync or healthy
+            # nodes that just failed go last, so a retry lands on another node
+            return sorted(
+                healthy,
+                key=lambda node: (
+                    node.consecutive_failures > 0,
+                    node.latency if node.latency is not None else float("inf"),
+                ),
+            )
+
+    def _pick(self) -> NodeState:
+        ranked = self._ranked()
+        if not ranked:
+            raise NoHealthyNodeError("No healthy chain node available")
+        return ranked[0]
+
+    def best(self) -> CommuneClient:
+        client = self._pick().client
+        assert client is not None
+        return client
+
+    @contextmanager
+    def connection(self) -> Generator[CommuneClient, None, None]:
+        """Yields the best client, recording whether the block using it
+        succeeded."""
+        node = self._pick()
+        assert node.client is not None
+        try:
+            yield node.client
+        except Exception:
+            self._record_failure(node)
+            raise
+        self._record_success(node)
+
+    def _retry_delay(self, attempt: int) -> float:
+        return min(self.base_backoff * 2 ** attempt, self.max_backoff) * random.random()
+
+    def run(self, fn: Callable[[CommuneClient], T], attempts: int = 3) -> T:
+        """Calls `fn` with the best client, failing over to the next best
+        node if it raises."""
+        for attempt in range(attempts):
+            try:
+                with self.connection() as client:
+                    return fn(client)
+            except NoHealthyNodeError:
+                raise
+            except Exception as e:
+                if attempt == attempts - 1:
+                    raise
+                log(f"WARN: Chain call failed on try {attempt}: {e}")
+                time.sleep(self._retry_delay(attempt))
+        raise AssertionError("unreachable")
+
+    async def run_async(
+        self, fn: Callable[[CommuneClient], Awaitable[T]], attempts: int = 3
+    ) -> T:
+        """Same as `run`, for coroutines that take a client."""
+        for attempt in range(attempts):
+            # picking a node might probe them, which blocks
+            node = await asyncio.to_thread(self._pick)
+            assert node.client is not None
+            try:
+                result = await fn(node.client)
+            except Exception as e:
+                self._record_failure(node)
+                if attempt == attempts - 1:
+                    raise
+                log(f"WARN: Chain call failed on try {attempt}: {e}")
+                await asyncio.sleep(self._retry_delay(attempt))
+                continue
+            self._record_success(node)
+            return result
+        raise AssertionError("unreachable")
+
+    def stats(self) -> list[dict[str, object]]:
+        now = time.time()
+        return [
+            {
+                "url": node.url,
+                "latency_ms": None if node.latency is None else round(node.latency * 1000),
+                "block": node.block,
+                "open": node.is_open(now),
+            }
+            for node in self.nodes if node.client is not None or node.is_open(now)
+        ]
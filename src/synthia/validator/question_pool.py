@@ -0,0 +1,179 @@
+import json
+import os
+import random
+import time
+from dataclasses import asdict, dataclass
+from typing import Any
+
+from ..utils import log
+from ._config import ValidatorSettings
+from .generate_data import ValidationDataset
+from .meta_prompt import Criteria
+
+
+@dataclass
+class PooledQuestion:
+    item: ValidationDataset
+    uses: int = 0
+
+
+class QuestionPool:
+    """Persistent pool of generated validation questions, reused across cycles.
+
+    Each question can be asked to up to `max_uses` miners and lives for `ttl`
+    seconds since it was generated (its `question_age`). Past either limit it
+    is evicted. Once the pool drops below `low_watermark` questions,
+    `deficit` asks for a top-up to `max_size`, so generation only happens in
+    bulk, and mostly in the idle window between cycles.
+
+    The pool file records the `embedder` model and the dimension of the
+    pooled embeddings. Questions embedded by another model, or with another
+    dimension, can't be compared with the miner answers, so they are dropped
+    when loaded, or when a question of the new dimension is added.
+    """
+
+    def __init__(
+        self,
+        path: str | None,
+        max_size: int = 100,
+        ttl: float = 6 * 60 * 60,
+        max_uses: int = 20,
+        low_watermark: int = 25,
+        embedder: str | None = None,
+    ) -> None:
+        assert 0 <= low_watermark <= max_size and max_uses > 0
+        self.path = os.path.expanduser(path) if path else None
+        self.max_size = max_size
+        self.ttl = ttl
+        self.max_uses = max_uses
+        self.low_watermark = low_watermark
+        self.embedder = embedder
+        self.dimension: int | None = None
+        self._questions: list[PooledQuestion] = []
+        self.load()
+
+    @classmethod
+    def from_settings(
+        cls, settings: ValidatorSettings, embedder: str | None = None
+    ) -> "QuestionPool":
+        return cls(
+            settings.question_pool_path or None,
+            max_size=settings.question_pool_size,
+            ttl=settings.question_max_age,
+            max_uses=settings.question_max_uses,
+            low_watermark=settings.question_pool_low_watermark,
+            embedder=embedder,
+        )
+
+    def __len__(self) -> int:
+        return len(self._questions)
+
+    def evict(self) -> None:
+        now = time.time()
+        kept = [
+            question for question in self._questions
+            if now - question.item.question_age <= self.ttl
+            and question.uses < self.max_uses
+        ]
+        if len(kept) < len(self._questions):
+            log(f"Evicted {len(self._questions) - len(kept)} questions from the pool")
+        self._questions = kept
+
+    def deficit(self) -> int:
+        """How many questions to generate, 0 while above the low watermark."""
+        self.evict()
+        if len(self._questions) >= self.low_watermark:
+            return 0
+        return self.max_size - len(self._questions)
+
+    def _match_dimension(self, dimension: int) -> None:
+        kept = [
+            question for question in self._questions
+            if len(question.item.embedded_val_answer) == dimension
+        ]
+        if len(kept) < len(self._questions):
+            log(
+                f"Dropped {len(self._questions) - len(kept)} pooled questions "
+                f"not embedded with {dimension} dimensions"
+            )
+        self._questions = kept
+        self.dimension = dimension
+
+    def add(self, item: ValidationDataset, uses: int = 0) -> None:
+        dimension = len(item.embedded_val_answer)
+        if dimension != self.dimension:
+            self._match_dimension(dimension)
+        self._questions.append(PooledQuestion(item, uses))
+        # when full, the oldest questions make room for the new one
+        if len(self._questions) > self.max_size:
+            self._questions.sort(key=lambda question: question.item.question_age)
+            del self._questions[:len(self._questions) - self.max_size]
+
+    def sample(self, amount: int) -> list[ValidationDataset]:
+        """Picks a question for each of `amount` miners.
+
+        The least used questions are picked first, so as many distinct
+        questions as possible are asked before any is repeated. May return
+        less than `amount` questions if the pool runs out of uses.
+        """
+        self.evict()
+        available = list(self._questions)
+        random.shuffle(available)
+        picked: list[ValidationDataset] = []
+        while available and len(picked) < amount:
+            available.sort(key=lambda question: question.uses)
+            for question in available[:amount - len(picked)]:
+                question.uses += 1
+                picked.append(question.item)
+            available = [q for q in available if q.uses < self.max_uses]
+        random.shuffle(picked)
+        return picked
+
+    def load(self) -> None:
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path) as file:
+                data: dict[str, Any] = json.load(file)
+            embedder: str | None = data["embedder"]
+            dimension: int | None = data["dimension"]
+            questions = [_from_record(record) for record in data["questions"]]
+        except (OSError, ValueError, TypeError, KeyError) as e:
+            log(f"WARN: Could not load the question pool from {self.path}: {e}")
+            return
+        if embedder != self.embedder:
+            log(
+                f"Dropped the {len(questions)} pooled questions, embedded by "
+                f"{embedder} instead of {self.embedder}"
+            )
+            return
+        self._questions = questions
+        if dimension is not None:
+            self._match_dimension(dimension)
+        self.evict()
+        log(f"Loaded {len(self._questions)} questions from {self.path}")
+
+    def save(self) -> None:
+        if not self.path:
+            return
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        # write then rename, so a crash never leaves a truncated pool behind
+        tmp_path = f"{self.path}.tmp"
+        data = {
+            "embedder": self.embedder,
+            "dimension": self.dimension,
+            "questions": [_to_record(question) for question in self._questions],
+        }
+        with open(tmp_path, "w") as file:
+            json.dump(data, file)
+        os.replace(tmp_path, self.path)
+
+
+def _to_record(question: PooledQuestion) -> dict[str, Any]:
+    return {"uses": question.uses, **asdict(question.item)}
+
+
+def _from_record(record: dict[str, Any]) -> PooledQuestion:
+    uses = record.pop("uses")
+    criteria = Criteria(**record.pop("criteria"))
+    return PooledQuestion(ValidationDataset(criteria=criteria, **record), uses)
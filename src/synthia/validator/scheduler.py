@@ -0,0 +1,195 @@
+import asyncio
+import json
+import os
+import time
+from collections import deque
+from typing import AsyncIterator, Awaitable, Callable, Mapping, TypeVar
+
+import numpy as np
+
+from ..utils import log
+from ._config import ValidatorSettings
+
+T = TypeVar("T")
+
+
+class LatencyTracker:
+    """Recent answer latencies of each miner, persisted across restarts.
+
+    Keyed by the miner ss58 address, so a uid taken over by another miner
+    doesn't inherit its history. Failed calls are recorded as None.
+    """
+
+    def __init__(self, path: str | None, history_size: int = 20) -> None:
+        self.path = os.path.expanduser(path) if path else None
+        self.history_size = history_size
+        self._history: dict[str, deque[float | None]] = {}
+        self.load()
+
+    def record(self, miner: str, latency: float | None) -> None:
+        history = self._history.setdefault(miner, deque(maxlen=self.history_size))
+        history.append(latency)
+
+    def history(self, miner: str) -> list[float | None]:
+        return list(self._history.get(miner, ()))
+
+    def last(self, miner: str) -> float | None:
+        history = self._history.get(miner)
+        return history[-1] if history else None
+
+    def load(self) -> None:
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path) as file:
+                records: dict[str, list[float | None]] = json.load(file)
+        except (OSError, ValueError) as e:
+            log(f"WARN: Could not load the miner latencies from {self.path}: {e}")
+            return
+        self._history = {
+            miner: deque(latencies, maxlen=self.history_size)
+            for miner, latencies in records.items()
+        }
+
+    def save(self) -> None:
+        if not self.path:
+            return
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as file:
+            json.dump({miner: list(h) for miner, h in self._history.items()}, file)
+        os.replace(tmp_path, self.path)
+
+
+class QueryScheduler:
+    """Queries miners with bounded concurrency and adaptive timeouts.
+
+    At most `max_concurrency` miners are queried at once. Each miner gets
+    a timeout of `margin` times the `percentile` of its past latencies,
+    clamped to [`min_timeout`, `max_timeout`]. Miners without enough
+    history get `max_timeout`, and miners that failed every recent call
+    get `min_timeout`. Whatever is still running after `deadline` seconds
+    is cancelled.
+    """
+
+    def __init__(
+        self,
+        latencies: LatencyTracker,
+        max_timeout: float,
+        min_timeout: float = 30,
+        max_concurrency: int = 256,
+        deadline: float = 300,
+        percentile: float = 95,
+        margin: float = 1.5,
+        min_samples: int = 5,
+    ) -> None:
+        assert 0 < min_timeout <= max_timeout and max_concurrency > 0
+        self.latencies = latencies
+        self.max_timeout = max_timeout
+        self.min_timeout = min_timeout
+        self.max_concurrency = max_concurrency
+        self.deadline = deadline
+        self.percentile = percentile
+        self.margin = margin
+        self.min_samples = min_samples
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._semaphore: asyncio.Semaphore | None = None
+
+    @classmethod
+    def from_settings(
+        cls, latencies: LatencyTracker, max_timeout: float, settings: ValidatorSettings
+    ) -> "QueryScheduler":
+        return cls(
+            latencies,
+            max_timeout=max_timeout,
+            min_timeout=min(settings.min_call_timeout, max_timeout),
+            max_concurrency=settings.max_concurrent_queries,
+            deadline=settings.cycle_query_deadline,
+        )
+
+    def timeout_for(self, miner: str) -> float:
+        history = self.latencies.history(miner)
+        if len(history) < self.min_samples:
+            return self.max_timeout
+        successes = [latency for latency in history if latency is not None]
+        if not successes:
+            return self.min_timeout
+        timeout = float(np.percentile(successes, self.percentile)) * self.margin
+        return min(max(timeout, self.min_timeout), self.max_timeout)
+
+    async def query(
+        self, miner: str, call: Callable[[float], Awaitable[str | None]]
+    ) -> str | None:
+        """Calls a miner once a concurrency slot is free, recording how long
+        it took to answer.
+
+        Args:
+            miner: The miner ss58 address.
+            call: Queries the miner with the given timeout, returning the
+                answer or None on failure.
+        """
+        async with self._get_semaphore():
+            start = time.monotonic()
+            try:
+                answer = await call(self.timeout_for(miner))
+            except asyncio.CancelledError:
+                # cut at the cycle deadline, which counts as a failure
+                self.latencies.record(miner, None)
+                raise
+            latency = time.monotonic() - start
+        self.latencies.record(miner, latency if answer else None)
+        return answer
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        # the semaphore is bound to the event loop that first waits on it
+        loop = asyncio.get_running_loop()
+        if self._semaphore is None or self._loop is not loop:
+            self._loop = loop
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._semaphore
+
+    async def stream(self, jobs: Mapping[int, Awaitable[T]]) -> AsyncIterator[tuple[int, T]]:
+        """Runs the jobs of a cycle, yielding each result as soon as it's
+        ready. Jobs still running after the deadline are cancelled, and jobs
+        that raise are logged and skipped.
+
+        Yields:
+            The uid and result of each finished job.
+        """
+        if not jobs:
+            return
+        loop = asyncio.get_running_loop()
+        tasks = {asyncio.ensure_future(job): uid for uid, job in jobs.items()}
+        start = loop.time()
+        pending = set(tasks)
+        try:
+            while pending:
+                remaining = start + self.deadline - loop.time()
+                if remaining <= 0:
+                    break
+                done, pending = await asyncio.wait(
+                    pending, timeout=remaining, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    if task.cancelled():
+                        continue
+                    if task.exception() is not None:
+                        log(f"Query to miner {tasks[task]} failed: {task.exception()}")
+                        continue
+                    yield tasks[task], task.result()
+        finally:
+            for task in pending:
+                task.cancel()
+            if pending:
+                log(f"Cancelled {len(pending)} miner queries at the cycle deadline")
+            log(f"Queried {len(tasks)} miners in {loop.time() - start:.1f}s")
+            self.latencies.save()
+
+    async def run(self, jobs: Mapping[int, Awaitable[T]]) -> dict[int, T]:
+        """Runs the jobs of a cycle until they finish or the deadline passes.
+
+        Returns:
+            The result of each uid whose job finished before the deadline
+            without raising.
+        """
+        return {uid: result async for uid, result in self.stream(jobs)}
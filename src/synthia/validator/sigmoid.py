@@ -1,9 +1,38 @@
 import math
 
+import numpy as np
+from numpy.typing import NDArray
+
 
 def sigmoid(x: float):
     return 1 / (1 + math.exp(-x))
 
+
+def threshold_sigmoid_rewards(
+    scores: NDArray[np.float64],
+    threshold_percentage: float = 0.2,
+    steepness: float = 5.0,
+    high_reward: float = 1.0,
+    low_reward: float = 0.01,
+) -> NDArray[np.float64]:
+    """Array version of `threshold_sigmoid_reward_distribution`.
+
+    Args:
+        scores: The score of each miner.
+
+    Returns:
+        The adjusted score of each miner, in the same order.
+    """
+    # summed in Python rather than with numpy's pairwise sum, which differs
+    # in the last bit and can move the threshold
+    mean_score = sum(scores.tolist()) / len(scores)
+    # the threshold is a percentage above the mean score
+    threshold = mean_score * (1 + threshold_percentage)
+    exponent = -((np.asarray(scores, dtype=np.float64) - threshold) * steepness)
+    reward_ratio = 1 / (1 + np.exp(exponent))
+    return low_reward + (high_reward - low_reward) * reward_ratio
+
+
 def threshold_sigmoid_reward_distribution(score_dict: dict[int, float]) -> dict[int, float]:
     """
     Adjusts the distribution of scores, such that the best miners are rewarded significantly more than the rest.
@@ -15,26 +44,6 @@ def threshold_sigmoid_reward_distribution(score_dict: dict[int, float]) -> dict[
     Returns:
         A dictionary mapping miner UIDs to their adjusted scores.
     """
-    # Calculate the mean score
-    mean_score = sum(score_dict.values()) / len(score_dict)
-
-    # Set the threshold as a percentage above the mean score
-    threshold_percentage = 0.2  
-    threshold = mean_score * (1 + threshold_percentage)
-
-   
-    steepness = 5.0  # steepness for sharper punishment
-
-    # Set the high and low rewards
-    high_reward = 1.0
-    low_reward = 0.01  
-
-    # Calculate the adjusted scores using the sigmoid function
-    adjusted_scores : dict[int, float] = {}
-    for model_id, score in score_dict.items():
-        normalized_score = (score - threshold) * steepness
-        reward_ratio = sigmoid(normalized_score)
-        adjusted_score = low_reward + (high_reward - low_reward) * reward_ratio
-        adjusted_scores[model_id] = adjusted_score
-
-    return adjusted_scores
+    scores = np.fromiter(score_dict.values(), dtype=np.float64, count=len(score_dict))
+    adjusted = threshold_sigmoid_rewards(scores)
+    return dict(zip(score_dict.keys(), adjusted.tolist()))
@@ -1,7 +1,12 @@
+import asyncio
+import inspect
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
+from functools import cache
 from typing import Any, Protocol
 
 import numpy
+import numpy.typing as npt
 import openai
 from pydantic_settings import BaseSettings
 from transformers import Pipeline, pipeline  # type: ignore
@@ -65,11 +70,63 @@ class EmbeddingModelSpec:
 class Embedder(Protocol):
     def get_embedding(self, input: str) -> list[float]: ...
 
+    def get_embeddings(self, inputs: list[str]) -> list[list[float]]: ...
+
+
+class AsyncEmbedder(Protocol):
+    async def get_embedding(self, input: str) -> list[float]: ...
+
+    async def get_embeddings(self, inputs: list[str]) -> list[list[float]]: ...
+
 
 class Distancer(Protocol):
     def get_distance(self, input_1: str, input_2: str) -> float: ...
 
 
+# Per-request limits of the OpenAI embeddings endpoint
+OPENAI_MAX_BATCH_INPUTS = 2048
+OPENAI_MAX_BATCH_TOKENS = 300_000
+# Pessimistic chars/token ratio, so we don't need a tokenizer to estimate sizes
+CHARS_PER_TOKEN = 3
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def chunk_inputs(
+    inputs: list[str],
+    max_inputs: int = OPENAI_MAX_BATCH_INPUTS,
+    max_tokens: int = OPENAI_MAX_BATCH_TOKENS,
+) -> list[list[str]]:
+    """Splits the inputs into consecutive chunks that fit the request limits.
+
+    Args:
+        inputs: The texts to be embedded.
+        max_inputs: Maximum amount of texts in a single chunk.
+        max_tokens: Maximum (estimated) amount of tokens in a single chunk.
+
+    Returns:
+        The chunks, in the same order as the inputs.
+    """
+    chunks: list[list[str]] = []
+    current: list[str] = []
+    current_tokens = 0
+    for text in inputs:
+        tokens = estimate_tokens(text)
+        if current and (
+            len(current) >= max_inputs or current_tokens + tokens > max_tokens
+        ):
+            chunks.append(current)
+            current = []
+            current_tokens = 0
+        current.append(text)
+        current_tokens += tokens
+    if current:
+        chunks.append(current)
+    return chunks
+
+
 class OpenAIEmbedder(Embedder):
     def __init__(
         self, openai_settings: OpenAISettings, model: str = "text-embedding-3-small"
@@ -83,6 +140,106 @@ class OpenAIEmbedder(Embedder):
         embedding = response.data[0].embedding
         return embedding
 
+    def get_embeddings(self, inputs: list[str]) -> list[list[float]]:
+        embeddings: list[list[float]] = []
+        for chunk in chunk_inputs(inputs):
+            response = self.client.embeddings.create(model=self.model, input=chunk)
+            # the API doesn't promise to keep the input order
+            data = sorted(response.data, key=lambda item: item.index)
+            embeddings.extend(item.embedding for item in data)
+        return embeddings
+
+
+class AsyncOpenAIEmbedder(AsyncEmbedder):
+    """OpenAI embedder that doesn't block the event loop.
+
+    The chunks of a batch are sent concurrently, at most `max_concurrency`
+    requests at a time.
+    """
+
+    def __init__(
+        self,
+        openai_settings: OpenAISettings,
+        model: str = "text-embedding-3-small",
+        max_concurrency: int = 4,
+    ):
+        assert max_concurrency > 0
+        self.openai_settings = openai_settings
+        self.model = model
+        self.max_concurrency = max_concurrency
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._client: openai.AsyncOpenAI | None = None
+        self._semaphore: asyncio.Semaphore | None = None
+
+    def _get_loop_state(self) -> tuple[openai.AsyncOpenAI, asyncio.Semaphore]:
+        # Both the HTTP connections of the client and the semaphore are bound
+        # to the event loop that first uses them, so we rebuild them if we're
+        # called from a new one.
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop or self._client is None or self._semaphore is None:
+            self._loop = loop
+            self._client = openai.AsyncOpenAI(api_key=self.openai_settings.api_key)
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._client, self._semaphore
+
+    async def _embed_chunk(self, chunk: list[str]) -> list[list[float]]:
+        client, semaphore = self._get_loop_state()
+        async with semaphore:
+            response = await client.embeddings.create(model=self.model, input=chunk)
+        data = sorted(response.data, key=lambda item: item.index)
+        return [item.embedding for item in data]
+
+    async def get_embedding(self, input: str) -> list[float]:
+        embeddings = await self._embed_chunk([input])
+        return embeddings[0]
+
+    async def get_embeddings(self, inputs: list[str]) -> list[list[float]]:
+        chunks = chunk_inputs(inputs)
+        results = await asyncio.gather(*(self._embed_chunk(chunk) for chunk in chunks))
+        return [embedding for chunk in results for embedding in chunk]
+
+
+class ThreadedEmbedder(AsyncEmbedder):
+    """Adapts a sync `Embedder` by running its calls in a thread pool."""
+
+    def __init__(self, embedder: Embedder, max_workers: int = 4):
+        self.embedder = embedder
+        self.executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="embedder"
+        )
+
+    async def get_embedding(self, input: str) -> list[float]:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self.executor, self.embedder.get_embedding, input
+        )
+
+    async def get_embeddings(self, inputs: list[str]) -> list[list[float]]:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self.executor, self.embedder.get_embeddings, inputs
+        )
+
+
+def embedder_model(embedder: Embedder | AsyncEmbedder) -> str | None:
+    """Name of the model behind an embedder, looking through the wrappers
+    (thread pools, caches) around it. None if it can't be told."""
+    inner: Any = embedder
+    while inner is not None:
+        model = getattr(inner, "model", None)
+        if isinstance(model, str):
+            return model
+        inner = getattr(inner, "embedder", None)
+    return None
+
+
+def as_async_embedder(embedder: Embedder | AsyncEmbedder) -> AsyncEmbedder:
+    """Returns the embedder itself if it's async, otherwise wraps it in a
+    `ThreadedEmbedder`."""
+    if inspect.iscoroutinefunction(embedder.get_embeddings):
+        return embedder  # type: ignore
+    return ThreadedEmbedder(embedder)  # type: ignore
+
 
 # class JairiumDistancer(Distancer):
 #     def __init__(self) -> None:
@@ -112,14 +269,19 @@ def do_classify(classifier: Pipeline, text: str) -> str | None:
         return text
 
 
+GIBBERISH_MODEL = "madhurjindal/autonlp-Gibberish-Detector-492513457"
+
+
+@cache
 def get_classifier() -> Pipeline:
     """Get the classifier pipeline for gibberish detection.
 
+    The pipeline is loaded once and shared by every caller.
+
     Returns:
         Pipeline: The classifier pipeline using the selected model.
     """
-    selected_model = "madhurjindal/autonlp-Gibberish-Detector-492513457"
-    classifier = pipeline("text-classification", model=selected_model)
+    classifier = pipeline("text-classification", model=GIBBERISH_MODEL)
     return classifier
 
 
@@ -130,6 +292,51 @@ def euclidean_distance(list_1: list[float], list_2: list[float]) -> float:
     return float(norm)
 
 
+def unit_euclid_distances(
+    miner_embeddings: npt.NDArray[numpy.float32],
+    val_embeddings: npt.NDArray[numpy.float32],
+    val_index: npt.NDArray[numpy.intp] | None = None,
+) -> npt.NDArray[numpy.float32]:
+    """Computes the normalized euclidean distance of every miner embedding
+    to its validation embedding in a single vectorized pass.
+
+    The distance of a pair is `|m - v| / (|m| + |v|)`, so it lies in [0, 1].
+
+    Args:
+        miner_embeddings: (N, D) matrix with one miner embedding per row.
+        val_embeddings: (N, D) matrix with the matching validation embeddings,
+            or (M, D) matrix of distinct validation embeddings if `val_index`
+            is given.
+        val_index: (N,) array with the row of `val_embeddings` that each
+            miner embedding is compared against.
+
+    Returns:
+        (N,) array of normalized distances.
+    """
+    miner_embeddings = numpy.asarray(miner_embeddings, dtype=numpy.float32)
+    val_embeddings = numpy.asarray(val_embeddings, dtype=numpy.float32)
+    # each validation answer is shared by many miners, so its norm is only
+    # computed once before being broadcast to the miner rows
+    val_norms = numpy.linalg.norm(val_embeddings, axis=1)
+    if val_index is not None:
+        val_embeddings = val_embeddings[val_index]
+        val_norms = val_norms[val_index]
+    assert miner_embeddings.shape == val_embeddings.shape
+    miner_norms = numpy.linalg.norm(miner_embeddings, axis=1)
+    distances = numpy.linalg.norm(miner_embeddings - val_embeddings, axis=1)
+    return distances / (miner_norms + val_norms)
+
+
+def score_embeddings(
+    miner_embeddings: npt.NDArray[numpy.float32],
+    val_embeddings: npt.NDArray[numpy.float32],
+    val_index: npt.NDArray[numpy.intp] | None = None,
+) -> npt.NDArray[numpy.float32]:
+    """Scores miner embeddings against validation embeddings, 1 being the
+    best score. See `unit_euclid_distances` for the arguments."""
+    return 1 - unit_euclid_distances(miner_embeddings, val_embeddings, val_index)
+
+
 # def main(openai_settings: OpenAISettings):
 #     import numpy as np
 
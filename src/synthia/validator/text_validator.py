@@ -1,13 +1,12 @@
 import asyncio
 import random
-import re
+import signal
 import time
 from dataclasses import dataclass
 from enum import Enum
+from typing import Any, AsyncIterator
 
 import numpy as np
-import requests
-from communex._common import get_node_url  # type: ignore
 from communex.client import CommuneClient  # type: ignore
 from communex.compat.key import check_ss58_address  # type: ignore
 from communex.module.client import ModuleClient  # type: ignore
@@ -19,22 +18,42 @@ from time import sleep
 
 from ..miner._config import AnthropicSettings, OpenrouterSettings
 from ..miner.anthropic import AnthropicModule, OpenrouterModule
-from ..utils import log, retry
+from ..utils import async_retry, log
 from ._config import ValidatorSettings
-from .generate_data import InputGenerator
+from .answer_journal import AnswerJournal
+from .dedup import NearDuplicateIndex
+from .generate_data import InputGenerator, ValidationDataset
+from .gibberish import GibberishFilter
+# IP_REGEX, extract_address and get_ip_port are re-exported for the code
+# importing them from here, from before they moved to the metagraph module
+from .metagraph import IP_REGEX as IP_REGEX
+from .metagraph import MetagraphCache, MetagraphSnapshot, get_current_block
+from .metagraph import extract_address as extract_address
+from .metagraph import get_ip_port as get_ip_port
+from .miner_pool import MinerConnectionPool
+from .node_pool import NodePool
+from .question_pool import QuestionPool
+from .scheduler import LatencyTracker, QueryScheduler
 from .meta_prompt import Criteria, get_miner_prompt
-from .sigmoid import threshold_sigmoid_reward_distribution
-from .similarity import (Embedder, OpenAIEmbedder, OpenAISettings,
-                         euclidean_distance)
+from .similarity import (AsyncEmbedder, AsyncOpenAIEmbedder, Embedder,
+                         OpenAISettings, as_async_embedder, embedder_model,
+                         score_embeddings)
+from .uploader import DataUploader
+from .vote_tracker import VoteTracker
+from .weights import compute_weights, top_k
 
-# TODO: make it match ipv6
-IP_REGEX = re.compile(r"\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3}:\d+")
 NUM_QUESTIONS_PER_CYCLE = 5
 MINIMUM_DATASET_SCORE = 0.7
 
 
 def set_weights(
-    score_dict: dict[int, float], netuid: int, client: CommuneClient, key: Keypair
+    score_dict: dict[int, float],
+    netuid: int,
+    client: CommuneClient | NodePool,
+    key: Keypair,
+    metagraph: MetagraphSnapshot | None = None,
+    settings: ValidatorSettings | None = None,
+    vote_tracker: VoteTracker | None = None,
 ) -> None:
     """
     Set weights for miners based on their scores.
@@ -42,42 +61,55 @@ def set_weights(
     Args:
         score_dict (dict[int, float]): A dictionary mapping miner UIDs to their scores.
         netuid (int): The network UID.
-        client (CommuneClient): The CommuneX client.
+        client (CommuneClient | NodePool): The CommuneX client, or a pool of
+            nodes to fail over between.
         key (Keypair): The keypair for signing transactions.
+        metagraph (MetagraphSnapshot, optional): If given, uids that are not
+            registered in it are not voted on.
+        settings (ValidatorSettings, optional): Read from the environment
+            when not given.
+        vote_tracker (VoteTracker, optional): If given, the vote is skipped
+            when it's too close to the last one.
     """
 
-    cut_weights = cut_to_max_allowed_weights(score_dict)
-    adjsuted_to_sigmoid = threshold_sigmoid_reward_distribution(cut_weights)
-
-    # Create a new dictionary to store the weighted scores
-    weighted_scores: dict[int, int] = {}
-
-    # Calculate the sum of all inverted scores
-    scores = sum(adjsuted_to_sigmoid.values())
-
-    # Iterate over the items in the score_dict
-    for uid, score in adjsuted_to_sigmoid.items():
-        # Calculate the normalized weight as an integer
-        weight = int(score * 1000 / scores)
-
-        # Add the weighted score to the new dictionary
-        weighted_scores[uid] = weight
-
-    # filter out 0 weights
-    weighted_scores = {k: v for k, v in weighted_scores.items() if v != 0}
+    if not settings:
+        settings = ValidatorSettings()  # type: ignore
 
-    uids = list(weighted_scores.keys())
-    weights = list(weighted_scores.values())
+    if metagraph is not None:
+        score_dict = {
+            uid: score for uid, score in score_dict.items() if uid in metagraph.keys
+        }
+
+    uids, weights = compute_weights(
+        score_dict,
+        settings.max_allowed_weights,
+        largest_remainder=settings.weights_largest_remainder,
+    )
+    block = None
+    if vote_tracker is not None:
+        if isinstance(client, NodePool):
+            block = client.run(get_current_block)
+        else:
+            block = get_current_block(client)
+        max_weight_age = metagraph.max_weight_age if metagraph is not None else None
+        if not vote_tracker.should_submit(uids, weights, block, max_weight_age):
+            return
     log(f"Settings weights for the following uids: {uids}")
-    try:
-        client.vote(key=key, uids=uids, weights=weights, netuid=netuid)
-    except Exception as e:
-        log(f"WARNING: Failed to set weights with exception: {e}. Will retry.")
-        sleep_time = random.uniform(1, 2)
-        sleep(sleep_time)
-        # retry with a different node
-        client = CommuneClient(get_node_url())
-        client.vote(key=key, uids=uids, weights=weights, netuid=netuid)
+    if isinstance(client, NodePool):
+        # retries on the next best node
+        client.run(
+            lambda node: node.vote(key=key, uids=uids, weights=weights, netuid=netuid)
+        )
+    else:
+        try:
+            client.vote(key=key, uids=uids, weights=weights, netuid=netuid)
+        except Exception as e:
+            log(f"WARNING: Failed to set weights with exception: {e}. Will retry.")
+            sleep_time = random.uniform(1, 2)
+            sleep(sleep_time)
+            client.vote(key=key, uids=uids, weights=weights, netuid=netuid)
+    if vote_tracker is not None and block is not None:
+        vote_tracker.record(uids, weights, block)
 
 
 def cut_to_max_allowed_weights(
@@ -91,29 +123,17 @@ def cut_to_max_allowed_weights(
 
     Returns:
             dict[int, float]: A dictionary mapping miner UIDs to their scores,
-            where the scores have been cut to the maximum allowed weights.
+            where the scores have been cut to the maximum allowed weights,
+            sorted from highest to lowest.
     """
 
     if not settings:
         settings = ValidatorSettings()  # type: ignore
 
-    max_allowed_weights = settings.max_allowed_weights
-
-    # sort the score by highest to lowest
-    sorted_scores = sorted(
-        score_dict.items(), key=lambda x: x[1], reverse=True)
-
-    # cut to max_allowed_weights
-    cut_scores = sorted_scores[:max_allowed_weights]
-
-    return dict(cut_scores)
-
-
-def extract_address(string: str):
-    """
-    Extracts an address from a string.
-    """
-    return re.search(IP_REGEX, string)
+    uids = np.fromiter(score_dict.keys(), dtype=np.int64, count=len(score_dict))
+    scores = np.fromiter(score_dict.values(), dtype=np.float64, count=len(score_dict))
+    cut_uids, cut_scores = top_k(uids, scores, settings.max_allowed_weights)
+    return dict(zip(cut_uids.tolist(), cut_scores.tolist()))
 
 
 def get_synthia_netuid(clinet: CommuneClient, subnet_name: str = "synthia"):
@@ -135,30 +155,11 @@ def get_synthia_netuid(clinet: CommuneClient, subnet_name: str = "synthia"):
     raise ValueError(f"Subnet {subnet_name} not found")
 
 
-def get_ip_port(modules_adresses: dict[int, str]):
-    filtered_addr = {id: extract_address(addr)
-                     for id, addr in modules_adresses.items()}
-    ip_port = {
-        id: x.group(0).split(":") for id, x in filtered_addr.items() if x is not None
-    }
-    return ip_port
-
-
 class ClaudeProviders(Enum):
     ANTHROPIC = "anthropic"
     OPENROUTER = "openrouter"
 
 
-@dataclass
-class ValidationDataset:
-    prompt: str
-    val_answer: str
-    criteria: Criteria
-    question_age: float
-    chosen_subject: str
-    embedded_val_answer: list[float]
-
-
 @dataclass
 class ModuleInfo:
     uid: int
@@ -166,6 +167,15 @@ class ModuleInfo:
     key: Ss58Address
 
 
+@dataclass
+class ScoredAnswer:
+    answer: str
+    val_info: ValidationDataset
+    score: float
+    # None for answers rejected before being embedded
+    embedding: list[float] | None
+
+
 class TextValidator(Module):
     """A class for validating text data using a Synthia network.
 
@@ -202,19 +212,32 @@ class TextValidator(Module):
         netuid: int,
         client: CommuneClient,
         provider: ClaudeProviders = ClaudeProviders.OPENROUTER,
-        embedder: Embedder | None = None,
+        embedder: Embedder | AsyncEmbedder | None = None,
         call_timeout: int = 60,
+        node_pool: NodePool | None = None,
     ) -> None:
         super().__init__()
         self.client = client
+        # created from the settings on the first step when not given
+        self.node_pool = node_pool
         self.key = key
         self.netuid = netuid
         if not embedder:
-            embedder = OpenAIEmbedder(OpenAISettings())  # type: ignore
-        self.embedder = embedder
+            embedder = AsyncOpenAIEmbedder(OpenAISettings())  # type: ignore
+        # sync embedders are run in a thread pool, so they don't block the
+        # event loop driving the miner calls
+        self.embedder = as_async_embedder(embedder)
         self.upload_client = ModuleClient("5.161.229.89", 80, self.key)
         self.call_timeout = call_timeout
         self.provider = provider
+        self.question_pool: QuestionPool | None = None
+        self.miner_pool: MinerConnectionPool | None = None
+        self.scheduler: QueryScheduler | None = None
+        self.metagraph: MetagraphCache | None = None
+        self.vote_tracker: VoteTracker | None = None
+        self.uploader: DataUploader | None = None
+        self.answer_journal: AnswerJournal | None = None
+        self.gibberish_filter: GibberishFilter | None = None
 
     def get_modules(self, client: CommuneClient, netuid: int) -> dict[int, str]:
         """Retrieves all module addresses from the subnet.
@@ -229,8 +252,7 @@ class TextValidator(Module):
         module_addreses = client.query_map_address(netuid)
         return module_addreses
 
-    def _get_validation_dataset(self, settings: ValidatorSettings, size: int):
-
+    def _get_claude(self, settings: ValidatorSettings):
         # TODO: make ValidatorSettings and the miners settings inherit from a
         # common protocol
         match self.provider:
@@ -246,33 +268,234 @@ class TextValidator(Module):
                 claude_settings.max_tokens = settings.max_tokens
                 claude_settings.model = settings.model
                 claude = OpenrouterModule(claude_settings)
+        return claude
+
+    async def _generate_validation_item(
+        self, input_generator: InputGenerator, semaphore: asyncio.Semaphore
+    ) -> ValidationDataset:
+        @async_retry(4, [Exception])
+        async def generate_explanation():
+            # the LLM clients are blocking, so they run in the default thread pool
+            async with semaphore:
+                return await asyncio.to_thread(input_generator.gen_explanation)
+
+        explanations, prompt, criteria = await generate_explanation()
+        questions_age = time.time()
+        subject, val_answer = self._split_val_subject(explanations)
+        embedded_val_answer = await self.embedder.get_embedding(val_answer)
+        return ValidationDataset(
+            prompt=prompt,
+            criteria=criteria,
+            question_age=questions_age,
+            val_answer=val_answer,
+            chosen_subject=subject,
+            embedded_val_answer=embedded_val_answer,
+        )
 
-        ig = InputGenerator(claude)
+    def _start_validation_dataset(
+        self, settings: ValidatorSettings, size: int
+    ) -> list[asyncio.Task[ValidationDataset]]:
+        """Starts generating `size` validation items concurrently.
 
-        retrier = retry(4, [Exception])
-        generate_explanations = retrier(ig.gen_explanation)
+        Each item is retried on its own, and at most
+        `settings.max_concurrent_generations` explanations are generated at
+        the same time.
 
-        validation_list: list[ValidationDataset] = []
-        for _ in range(size):
-            explanations, prompt, criteria = generate_explanations()
-            questions_age = time.time()
-            subject, val_answer = self._split_val_subject(explanations)
-            embedded_val_answer = self.embedder.get_embedding(val_answer)
-            val_dataset = ValidationDataset(
-                prompt=prompt,
-                criteria=criteria,
-                question_age=questions_age,
-                val_answer=val_answer,
-                chosen_subject=subject,
-                embedded_val_answer=embedded_val_answer,
+        Returns:
+            One task per item, so callers can start using each item as soon
+            as it's ready.
+        """
+        input_generator = InputGenerator(self._get_claude(settings))
+        semaphore = asyncio.Semaphore(settings.max_concurrent_generations)
+        return [
+            asyncio.create_task(
+                self._generate_validation_item(input_generator, semaphore)
             )
-            validation_list.append(val_dataset)
+            for _ in range(size)
+        ]
+
+    async def _get_validation_dataset(
+        self, settings: ValidatorSettings, size: int
+    ) -> list[ValidationDataset]:
+        tasks = self._start_validation_dataset(settings, size)
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+        validation_list: list[ValidationDataset] = []
+        for result in results:
+            if isinstance(result, BaseException):
+                log(f"Failed to generate validation data: {result}")
+                continue
+            validation_list.append(result)
         return validation_list
 
+    def _get_question_pool(self, settings: ValidatorSettings) -> QuestionPool:
+        if self.question_pool is None:
+            self.question_pool = QuestionPool.from_settings(
+                settings, embedder_model(self.embedder)
+            )
+        return self.question_pool
+
+    async def prefetch_questions(self, settings: ValidatorSettings) -> None:
+        """Tops up the question pool if it's below its low watermark."""
+        pool = self._get_question_pool(settings)
+        deficit = pool.deficit()
+        if not deficit:
+            return
+        log(f"Topping up the question pool with {deficit} questions")
+        tasks = self._start_validation_dataset(settings, deficit)
+        try:
+            # added as they finish, so a timeout doesn't lose the whole batch
+            for task in asyncio.as_completed(tasks):
+                try:
+                    pool.add(await task)
+                except Exception as e:
+                    log(f"Failed to prefetch validation data: {e}")
+        finally:
+            for task in tasks:
+                task.cancel()
+            pool.save()
+        log(f"Question pool has {len(pool)} questions")
+
+    async def _prefetch_before(
+        self, settings: ValidatorSettings, cycle_start: float
+    ) -> None:
+        """Tops up the question pool shortly before the next cycle.
+
+        Args:
+            cycle_start: Event loop time the next cycle starts at.
+        """
+        # questions are generated close to the next cycle, so they are still
+        # fresh when it starts
+        loop = asyncio.get_running_loop()
+        await asyncio.sleep(max(0, cycle_start - settings.prefetch_lead_time - loop.time()))
+        try:
+            await asyncio.wait_for(
+                self.prefetch_questions(settings),
+                timeout=max(0, cycle_start - loop.time()),
+            )
+        except asyncio.TimeoutError:
+            log("Prefetching didn't finish before the next cycle")
+
+    def _get_questions(
+        self, settings: ValidatorSettings, amount: int
+    ) -> tuple[
+        list[asyncio.Future[ValidationDataset]],
+        list[asyncio.Future[ValidationDataset]],
+    ]:
+        """Picks a question for each of `amount` miners.
+
+        Questions come from the pool. If it runs dry, a few questions are
+        generated on demand and shared among the remaining miners, and are
+        added to the pool once ready.
+
+        Returns:
+            The question of each miner, and the distinct questions, for
+            miners to fall back on if theirs fails to generate.
+        """
+        loop = asyncio.get_running_loop()
+        pool = self._get_question_pool(settings)
+        pooled: list[asyncio.Future[ValidationDataset]] = []
+        for item in pool.sample(amount):
+            question: asyncio.Future[ValidationDataset] = loop.create_future()
+            question.set_result(item)
+            pooled.append(question)
+        if len(pooled) == amount:
+            return pooled, pooled[:NUM_QUESTIONS_PER_CYCLE]
+
+        log("Question pool ran dry, generating questions on demand")
+        on_demand = self._start_validation_dataset(settings, NUM_QUESTIONS_PER_CYCLE)
+        assigned = pooled + [
+            random.choice(on_demand) for _ in range(amount - len(pooled))
+        ]
+
+        def add_to_pool(task: asyncio.Task[ValidationDataset]) -> None:
+            if not task.cancelled() and task.exception() is None:
+                pool.add(task.result(), uses=assigned.count(task))
+
+        for task in on_demand:
+            task.add_done_callback(add_to_pool)
+        return assigned, pooled[:NUM_QUESTIONS_PER_CYCLE] + on_demand
+
+    async def _await_question(
+        self,
+        question: asyncio.Future[ValidationDataset],
+        questions: list[asyncio.Future[ValidationDataset]],
+    ) -> ValidationDataset:
+        try:
+            return await asyncio.shield(question)
+        except Exception:
+            # the assigned question failed to generate, any other one will do
+            for other in asyncio.as_completed(questions):
+                try:
+                    return await other
+                except Exception:
+                    continue
+            raise RuntimeError("Failed to generate any validation question")
+
+    def _get_scheduler(self, settings: ValidatorSettings) -> QueryScheduler:
+        if self.scheduler is None:
+            latencies = LatencyTracker(
+                settings.latency_history_path or None,
+                settings.latency_history_size,
+            )
+            self.scheduler = QueryScheduler.from_settings(
+                latencies, self.call_timeout, settings
+            )
+        return self.scheduler
+
+    def _get_miner_pool(
+        self, settings: ValidatorSettings | None = None
+    ) -> MinerConnectionPool:
+        # callers querying a miner outside of a validation step get the
+        # default pool settings
+        if self.miner_pool is None:
+            if settings is None:
+                self.miner_pool = MinerConnectionPool(self.key)
+            else:
+                self.miner_pool = MinerConnectionPool.from_settings(self.key, settings)
+        return self.miner_pool
+
+    def _get_gibberish_filter(self, settings: ValidatorSettings) -> GibberishFilter | None:
+        if self.gibberish_filter is None and settings.gibberish_filter:
+            self.gibberish_filter = GibberishFilter.from_settings(settings)
+        return self.gibberish_filter
+
+    def _get_answer_journal(self, settings: ValidatorSettings) -> AnswerJournal | None:
+        if self.answer_journal is None and settings.answer_journal_path:
+            self.answer_journal = AnswerJournal.from_settings(settings)
+        return self.answer_journal
+
+    def _get_vote_tracker(self, settings: ValidatorSettings) -> VoteTracker:
+        if self.vote_tracker is None:
+            self.vote_tracker = VoteTracker.from_settings(
+                settings, self.netuid, self.key.ss58_address
+            )
+        return self.vote_tracker
+
+    async def _query_miner(
+        self,
+        question: asyncio.Future[ValidationDataset],
+        questions: list[asyncio.Future[ValidationDataset]],
+        scheduler: QueryScheduler,
+        miner_info: tuple[list[str], Ss58Address],
+        send_deadline: bool = False,
+    ) -> tuple[str | None, ValidationDataset]:
+        val_info = await self._await_question(question, questions)
+
+        async def call(timeout: float) -> str | None:
+            answer, _ = await self._get_miner_prediction(
+                val_info, miner_info, timeout, send_deadline
+            )
+            return answer
+
+        miner_answer = await scheduler.query(miner_info[1], call)
+        return miner_answer, val_info
+
     async def _get_miner_prediction(
         self,
         val_info: ValidationDataset,
         miner_info: tuple[list[str], Ss58Address],
+        timeout: float | None = None,
+        send_deadline: bool = False,
     ) -> tuple[str | None, ValidationDataset]:
         miner_answer: str | None | list[str] = None
 
@@ -284,11 +507,19 @@ class TextValidator(Module):
                 val_info.criteria, val_info.chosen_subject, len(
                     val_info.val_answer)
             )
-            client = ModuleClient(module_ip, int(module_port), self.key)
+            client = self._get_miner_pool().get_client(
+                module_ip, int(module_port), miner_key)
 
+            timeout = timeout or self.call_timeout
+            params: dict[str, Any] = {"prompt": question}
+            if send_deadline:
+                params["deadline"] = timeout
             try:
                 response = await client.call(
-                    "generate", miner_key, {"prompt": question}, timeout=self.call_timeout
+                    "generate",
+                    miner_key,
+                    params,
+                    timeout=timeout,  # type: ignore
                 )
                 miner_answer = response.get("answer")
                 if isinstance(miner_answer, list):
@@ -307,36 +538,191 @@ class TextValidator(Module):
         finally:
             return miner_answer, val_info
 
-    def _get_unit_euclid_distance(
-        self, embedded_miner_answer: list[float], embbeded_val_answer: list[float]
-    ):
-        distance = euclidean_distance(
-            embedded_miner_answer, embbeded_val_answer)
-        miner_norm = np.linalg.norm(embedded_miner_answer)
-        val_norm = np.linalg.norm(embbeded_val_answer)
-        normalized_distance = distance / (miner_norm + val_norm)
-        return float(normalized_distance)  # i hate python's type system
+    def _score_miners(
+        self,
+        embedded_miner_answers: list[list[float]],
+        val_infos: list[ValidationDataset],
+    ) -> list[float]:
+        """Scores all the miner answers of a cycle at once.
+
+        Args:
+            embedded_miner_answers: The embeddings of the miner answers.
+            val_infos: The validation data each answer is scored against.
+
+        Returns:
+            The scores, in the same order as the answers.
+        """
+        if not embedded_miner_answers:
+            return []
+        # the validation answers are shared between miners, so we only
+        # build a row for each distinct one and index into it
+        val_rows: dict[int, int] = {}
+        val_embeddings: list[list[float]] = []
+        val_index: list[int] = []
+        for val_info in val_infos:
+            row = val_rows.get(id(val_info))
+            if row is None:
+                row = val_rows[id(val_info)] = len(val_embeddings)
+                val_embeddings.append(val_info.embedded_val_answer)
+            val_index.append(row)
+
+        scores = score_embeddings(
+            np.asarray(embedded_miner_answers, dtype=np.float32),
+            np.asarray(val_embeddings, dtype=np.float32),
+            np.asarray(val_index, dtype=np.intp),
+        )
+        return scores.tolist()
 
     def _score_miner(
-        self, miner_answer: str | None, embbeded_val_answer: list[float]
-    ) -> float | None:
-        if not miner_answer:
-            return 0
-        if isinstance(miner_answer, list):
-            # index 0 is sure to exist because of the if not miner_answer if
-            # huge gambiarra because of openrouter API giving weird responses
-            miner_answer = miner_answer[0]
+        self, embedded_miner_answer: list[float], embbeded_val_answer: list[float]
+    ) -> float:
+        scores = score_embeddings(
+            np.asarray([embedded_miner_answer], dtype=np.float32),
+            np.asarray([embbeded_val_answer], dtype=np.float32),
+        )
+        return float(scores[0])
+
+    async def _embed_miner_answers(
+        self, miner_answers: list[str]
+    ) -> list[list[float] | None]:
+        """Embeds all the miner answers of a cycle in bulk requests.
+
+        If the bulk request fails, falls back to embedding the answers one by
+        one, so a single bad answer doesn't void the whole cycle.
+
+        Returns:
+            The embeddings, in the same order as the answers. Answers that
+            could not be embedded map to None.
+        """
+        if not miner_answers:
+            return []
         try:
-            embedded_miner_answer = self.embedder.get_embedding(miner_answer)
+            return list(await self.embedder.get_embeddings(miner_answers))
         except Exception as e:
-            log(f"WARN: Failed to embed miner answer: %20{miner_answer}%20")
-            print(e)
-            return None
+            log(f"WARN: Failed to embed miner answers in bulk: {e}")
+
+        embeddings: list[list[float] | None] = []
+        for miner_answer in miner_answers:
+            try:
+                embeddings.append(await self.embedder.get_embedding(miner_answer))
+            except Exception as e:
+                log(f"WARN: Failed to embed miner answer: %20{miner_answer}%20: {e}")
+                embeddings.append(None)
+        return embeddings
+
+    async def _scoring_worker(
+        self,
+        queue: asyncio.Queue[tuple[int, str, ValidationDataset] | None],
+        batch_size: int,
+        scored: dict[int, ScoredAnswer],
+        gibberish: GibberishFilter | None = None,
+    ) -> None:
+        """Embeds and scores the answers on the queue until it gets None.
+
+        Takes whatever answers piled up while the previous batch was being
+        embedded, so the batches grow when answers arrive faster than they
+        can be embedded. Answers rejected by the `gibberish` filter score 0
+        without being embedded. A batch failing to be scored is logged and
+        its answers are left unscored, so the worker keeps draining the
+        queue.
+        """
+        done = False
+        while not done:
+            item = await queue.get()
+            if item is None:
+                return
+            batch = [item]
+            while len(batch) < batch_size and not queue.empty():
+                item = queue.get_nowait()
+                if item is None:
+                    done = True
+                    break
+                batch.append(item)
+            try:
+                await self._score_batch(batch, scored, gibberish)
+            except Exception as e:
+                uids = [uid for uid, _, _ in batch]
+                log(f"WARN: Failed to score the answers of miners {uids}: {e}")
 
-        normalized_distance = self._get_unit_euclid_distance(
-            embedded_miner_answer, embbeded_val_answer
+    async def _score_batch(
+        self,
+        batch: list[tuple[int, str, ValidationDataset]],
+        scored: dict[int, ScoredAnswer],
+        gibberish: GibberishFilter | None = None,
+    ) -> None:
+        if gibberish is not None:
+            verdicts = await gibberish.aclassify(
+                [miner_answer for _, miner_answer, _ in batch]
+            )
+            for (uid, miner_answer, val_info), clean in zip(batch, verdicts):
+                if not clean:
+                    log(f"Miner {uid} answered gibberish")
+                    scored[uid] = ScoredAnswer(miner_answer, val_info, 0.0, None)
+            batch = [entry for entry, clean in zip(batch, verdicts) if clean]
+            if not batch:
+                return
+
+        embeddings = await self._embed_miner_answers(
+            [miner_answer for _, miner_answer, _ in batch]
+        )
+        embedded = [
+            (entry, embedding)
+            for entry, embedding in zip(batch, embeddings)
+            if embedding is not None
+        ]
+        scores = self._score_miners(
+            [embedding for _, embedding in embedded],
+            [val_info for (_, _, val_info), _ in embedded],
         )
-        return 1 - normalized_distance
+        for ((uid, miner_answer, val_info), embedding), score in zip(embedded, scores):
+            scored[uid] = ScoredAnswer(miner_answer, val_info, score, embedding)
+
+    async def _score_answers(
+        self,
+        settings: ValidatorSettings,
+        responses: AsyncIterator[tuple[int, tuple[str | None, ValidationDataset]]],
+    ) -> tuple[dict[int, ScoredAnswer], dict[int, list[int]]]:
+        """Scores the miner answers as they arrive.
+
+        Each answer is checked for near duplicates on arrival, then goes
+        through a bounded queue to the workers that embed and score it, so
+        this only waits on the last answers in flight once the miners are
+        done.
+
+        Returns:
+            The answer, validation data, score and embedding of each scored uid, and the
+            near duplicate groups of the answers.
+        """
+        queue: asyncio.Queue[tuple[int, str, ValidationDataset] | None] = asyncio.Queue(
+            maxsize=settings.embedding_batch_size * settings.scoring_workers
+        )
+        scored: dict[int, ScoredAnswer] = {}
+        workers = [
+            asyncio.create_task(
+                self._scoring_worker(
+                    queue,
+                    settings.embedding_batch_size,
+                    scored,
+                    self._get_gibberish_filter(settings),
+                )
+            )
+            for _ in range(settings.scoring_workers)
+        ]
+        duplicates = NearDuplicateIndex()
+        try:
+            async for uid, (miner_answer, val_info) in responses:
+                if not miner_answer:
+                    log(f"Skipping miner {uid} that didn't answer")
+                    continue
+                duplicates.add(uid, miner_answer)
+                await queue.put((uid, miner_answer, val_info))
+            for _ in workers:
+                await queue.put(None)
+            await asyncio.gather(*workers)
+        finally:
+            for worker in workers:
+                worker.cancel()
+        return scored, duplicates.groups()
 
     def _split_val_subject(self, val_answer: str):
         end_of_subject = val_answer.find("\n")
@@ -344,9 +730,9 @@ class TextValidator(Module):
         val_answer = val_answer[end_of_subject + 1:]
         return subject, val_answer
 
-    def _test_score(self, text_a: str, text_b: str):
-        embbeded_a = self.embedder.get_embedding(text_a)
-        score = self._score_miner(text_b, embbeded_a)
+    async def _test_score(self, text_a: str, text_b: str):
+        embbeded_a, embbeded_b = await self.embedder.get_embeddings([text_a, text_b])
+        score = self._score_miner(embbeded_b, embbeded_a)
         sim = fuzz.ratio(text_a, text_b)  # type: ignore
         log(f"Score: {score}, similarity: {sim}")
 
@@ -381,124 +767,227 @@ class TextValidator(Module):
             syntia_netuid: The netuid of the Synthia subnet.
         """
 
-        self.client = CommuneClient(get_node_url())
-        modules_adresses = self.get_modules(self.client, syntia_netuid)
-        modules_keys = self.client.query_map_key(syntia_netuid)
+        if self.node_pool is None:
+            self.node_pool = NodePool.from_settings(settings)
+        if self.metagraph is None or self.metagraph.netuid != syntia_netuid:
+            self.metagraph = MetagraphCache.from_settings(syntia_netuid, settings)
+        metagraph_cache = self.metagraph
+        metagraph = await self.node_pool.run_async(metagraph_cache.get)
         val_ss58 = self.key.ss58_address
-        if val_ss58 not in modules_keys.values():
+        if val_ss58 not in metagraph.keys.values():
+            # we might have just registered, after the snapshot was taken
+            metagraph = await self.node_pool.run_async(
+                lambda client: metagraph_cache.get(client, force_refresh=True)
+            )
+        if val_ss58 not in metagraph.keys.values():
             raise RuntimeError(
                 f"validator key {val_ss58} is not registered in subnet")
         modules_info: dict[int, ModuleInfo] = {}
 
-        modules_filtered_address = get_ip_port(modules_adresses)
-        for module_id in modules_keys.keys():
-            module_addr = modules_filtered_address.get(module_id, None)
+        for module_id, module_key in metagraph.keys.items():
+            module_addr = metagraph.addresses.get(module_id, None)
             if not module_addr:
                 continue
+            ip, port = module_addr
             modules_info[module_id] = ModuleInfo(
-                module_id, module_addr, modules_keys[module_id]
+                module_id, [ip, str(port)], module_key
             )
 
-        response_cache: list[str] = []
+        miner_pool = self._get_miner_pool(settings)
+        miner_pool.sync({
+            uid: (info.address[0], int(info.address[1]), info.key)
+            for uid, info in modules_info.items()
+        })
+
         score_dict: dict[int, float] = {}
         hf_data_list: list[dict[str, str]] = []
         # == Validation loop / Scoring ==
-        val_dataset = self._get_validation_dataset(
-            settings, NUM_QUESTIONS_PER_CYCLE)
+        # miners are queried as soon as the question assigned to them is
+        # ready, instead of waiting for the whole dataset to be generated
+        assigned, questions = self._get_questions(settings, len(modules_info))
 
         log(f"Selected the following miners: {modules_info.keys()}")
-        futures: list[asyncio.Task[tuple[str | None, ValidationDataset]]] = []
-        for mod_info in modules_info.values():
-            val_info = random.choice(val_dataset)
-            future = asyncio.create_task(
-                self._get_miner_prediction(
-                    val_info, (mod_info.address, mod_info.key))
-            )
-            futures.append(future)
-        miner_answers = await asyncio.gather(*futures, return_exceptions=True)
-        miner_answers = [
-            answer for answer in miner_answers if (
-                not isinstance(answer, BaseException)
-            )
-        ]
-
-        for uid, miner_response in zip(modules_info.keys(), miner_answers):
-            miner_answer, val_info = miner_response
-            if not miner_answer:
-                log(f"Skipping miner {uid} that didn't answer")
-                continue
-            score = self._score_miner(
-                miner_answer, val_info.embedded_val_answer
+        scheduler = self._get_scheduler(settings)
+        jobs = {
+            uid: self._query_miner(
+                question,
+                questions,
+                scheduler,
+                (mod_info.address, mod_info.key),
+                settings.send_miner_deadline,
             )
-            if score is None:
-                continue
-            for answer in response_cache:
-                similarity = fuzz.ratio(answer, miner_answer)  # type: ignore
-            response_cache.append(miner_answer)
-
+            for (uid, mod_info), question in zip(modules_info.items(), assigned)
+        }
+        scored, duplicate_groups = await self._score_answers(
+            settings, scheduler.stream(jobs)
+        )
+        log(f"Miner connection pool: {miner_pool.stats()}")
+        if duplicate_groups:
+            log(f"Near duplicate answers: {set(map(tuple, duplicate_groups.values()))}")
+
+        answer_journal = self._get_answer_journal(settings)
+        if answer_journal is not None:
+            answer_journal.start_cycle()
+            await asyncio.to_thread(answer_journal.prune)
+        for uid, answer in scored.items():
+            score = answer.score
             # score has to be lower or eq to 1, as one is the best score
             assert score <= 1
             score_dict[uid] = score
-            if score >= MINIMUM_DATASET_SCORE:
+            # only one answer of each group of near duplicates goes to the dataset
+            is_copy = uid in duplicate_groups and duplicate_groups[uid][0] != uid
+            if score >= MINIMUM_DATASET_SCORE and not is_copy:
                 hf_data = self._to_hf_data(
-                    val_info.criteria,
-                    val_info.chosen_subject,
-                    miner_answer,
+                    answer.val_info.criteria,
+                    answer.val_info.chosen_subject,
+                    answer.answer,
                     score,
                 )
                 hf_data_list.append(hf_data)
+            if answer_journal is not None:
+                miner_key = modules_info[uid].key
+                answer_journal.add(
+                    uid,
+                    miner_key,
+                    answer.val_info,
+                    answer.answer,
+                    score,
+                    latency=scheduler.latencies.last(miner_key),
+                    duplicate_of=duplicate_groups[uid][0] if uid in duplicate_groups else None,
+                    embedding=answer.embedding,
+                )
+                if answer_journal.full:
+                    await asyncio.to_thread(answer_journal.flush)
+        if answer_journal is not None:
+            # the journal write is blocking, and can be large
+            await asyncio.to_thread(answer_journal.flush)
+        self._get_question_pool(settings).save()
         if not score_dict:
             log("No miner managed to give a valid answer")
             return []
 
-        _ = set_weights(score_dict, self.netuid, self.client, self.key)
+        # voting blocks on the chain client
+        await asyncio.to_thread(
+            set_weights,
+            score_dict,
+            self.netuid,
+            self.node_pool,
+            self.key,
+            metagraph=metagraph,
+            settings=settings,
+            vote_tracker=self._get_vote_tracker(settings),
+        )
+        log(f"Weight votes: {self._get_vote_tracker(settings).stats()}")
+        log(f"Chain nodes: {self.node_pool.stats()}")
         return hf_data_list
 
-    def upload_data(
-        self, data: list[dict[str, str]], hf_uploader_ss58: Ss58Address
-    ) -> None:
-        """Uploads the validation data.
+    def _get_uploader(self, settings: ValidatorSettings) -> DataUploader:
+        if self.uploader is None:
+            hf_ss58 = check_ss58_address(settings.hf_uploader_ss58)
+            self.uploader = DataUploader.from_settings(
+                self.upload_client, hf_ss58, settings, timeout=self.call_timeout
+            )
+        return self.uploader
+
+    def _metrics(self) -> dict[str, object]:
+        metrics: dict[str, object] = {}
+        if self.miner_pool is not None:
+            metrics["miner_pool"] = self.miner_pool.stats()
+        if self.node_pool is not None:
+            metrics["chain_nodes"] = self.node_pool.stats()
+        if self.uploader is not None:
+            metrics["upload"] = self.uploader.stats()
+        if self.question_pool is not None:
+            metrics["question_pool"] = len(self.question_pool)
+        if self.vote_tracker is not None:
+            metrics["votes"] = self.vote_tracker.stats()
+        if self.gibberish_filter is not None:
+            metrics["gibberish"] = self.gibberish_filter.stats()
+        return metrics
+
+    async def _report_metrics(self, settings: ValidatorSettings) -> None:
+        while True:
+            await asyncio.sleep(settings.metrics_interval)
+            log(f"Metrics: {self._metrics()}")
 
-        Args:
-            data: A dictionary containing the validation data to upload.
-        """
-        max_attempts = 3
-        attempt = 1
-        upload_dict = {"data_list": data}
-        while attempt <= max_attempts:
-            try:
+    async def _probe_nodes(self, node_pool: NodePool, settings: ValidatorSettings) -> None:
+        # keeps the node ranking fresh between cycles, off the event loop
+        while True:
+            await asyncio.sleep(settings.node_probe_interval)
+            await asyncio.to_thread(node_pool.probe)
 
-                _ = asyncio.run(
-                    self.upload_client.call(
-                        "upload_to_hugging_face",
-                        hf_uploader_ss58,
-                        upload_dict,
-                        timeout=self.call_timeout,
-                    )
-                )
-                log("UPLOADED DATA")
-                break
-            except requests.exceptions.RequestException as e:
-                log(f"Upload attempt {attempt} failed: {e}")
-                attempt += 1
-                if attempt > max_attempts:
-                    log("Could not upload data. ")
+    async def run(self, settings: ValidatorSettings) -> None:
+        """Runs a validation cycle every `iteration_interval` seconds, until
+        SIGINT or SIGTERM.
+
+        Everything shares one event loop, so client sessions and caches
+        live across cycles. Uploads, question prefetching, node probes and
+        metrics run as tasks next to the cycles. On shutdown, the current
+        cycle is cancelled and the state of every component is saved.
+        """
+        loop = asyncio.get_running_loop()
+        stop = asyncio.Event()
+        signals = (signal.SIGINT, signal.SIGTERM)
+        for sig in signals:
+            loop.add_signal_handler(sig, stop.set)
+
+        uploader = self._get_uploader(settings)
+        if self.node_pool is None:
+            self.node_pool = NodePool.from_settings(settings)
+        background: list[asyncio.Task[None]] = [
+            asyncio.create_task(uploader.run()),
+            asyncio.create_task(self._report_metrics(settings)),
+            asyncio.create_task(self._probe_nodes(self.node_pool, settings)),
+        ]
+        stopping = asyncio.create_task(stop.wait())
+        prefetch: asyncio.Task[None] | None = None
+        try:
+            while not stop.is_set():
+                start = loop.time()
+                cycle = asyncio.create_task(self.validate_step(settings, self.netuid))
+                await asyncio.wait({cycle, stopping}, return_when=asyncio.FIRST_COMPLETED)
+                if not cycle.done():
+                    log("Shutting down, cancelling the current cycle")
+                    cycle.cancel()
+                    await asyncio.gather(cycle, return_exceptions=True)
                     break
+                db = cycle.result()
+                if db:
+                    await uploader.submit(db)
+
+                next_start = start + settings.iteration_interval
+                sleep_time = max(0, next_start - loop.time())
+                log(f"Sleeping for {sleep_time}")
+                prefetch = asyncio.create_task(self._prefetch_before(settings, next_start))
+                # a shutdown ends the sleep early
+                await asyncio.wait({stopping}, timeout=sleep_time)
+                prefetch.cancel()
+                await asyncio.gather(prefetch, return_exceptions=True)
+        finally:
+            for sig in signals:
+                loop.remove_signal_handler(sig)
+            tasks: list[asyncio.Task[Any]] = [*background, stopping]
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            await self.shutdown()
+
+    async def shutdown(self) -> None:
+        """Saves the state of every component and closes the connections."""
+        if self.uploader is not None:
+            # whatever is still queued is uploaded on the next start
+            self.uploader.stop()
+        if self.answer_journal is not None:
+            await asyncio.to_thread(self.answer_journal.flush)
+        if self.question_pool is not None:
+            self.question_pool.save()
+        if self.scheduler is not None:
+            self.scheduler.latencies.save()
+        if self.miner_pool is not None:
+            await self.miner_pool.close()
+        log("Validator stopped")
 
     def validation_loop(self, settings: ValidatorSettings | None = None) -> None:
         if not settings:
             settings = ValidatorSettings()  # type: ignore
-
-        # Run validation
-        hf_ss58 = check_ss58_address(settings.hf_uploader_ss58)
-        while True:
-            start_time = time.time()
-            db = asyncio.run(self.validate_step(settings, self.netuid))
-            if db:
-                self.upload_data(db, hf_ss58)
-
-            elapsed = time.time() - start_time
-            if elapsed < settings.iteration_interval:
-                sleep_time = settings.iteration_interval - elapsed
-                log(f"Sleeping for {sleep_time}")
-                time.sleep(sleep_time)
+        asyncio.run(self.run(settings))
@@ -0,0 +1,276 @@
+import asyncio
+import json
+import os
+import random
+import threading
+import time
+from collections import deque
+from typing import Any
+
+from communex.module.client import ModuleClient  # type: ignore
+from communex.types import Ss58Address  # type: ignore
+
+from ..utils import log
+from ._config import ValidatorSettings
+
+Record = dict[str, Any]
+
+
+class UploadJournal:
+    """Append-only file of records waiting to be uploaded.
+
+    Records are appended as JSON lines and read back from a committed
+    offset, which is kept in a file next to the journal. Once every record
+    is committed, both files are truncated. The file I/O is blocking, the
+    uploader runs it in worker threads, so the methods hold a lock.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = os.path.expanduser(path)
+        self.offset_path = f"{self.path}.offset"
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self.offset = 0
+        self._lock = threading.Lock()
+        if os.path.exists(self.offset_path):
+            try:
+                with open(self.offset_path) as file:
+                    self.offset = int(file.read().strip() or 0)
+            except (OSError, ValueError) as e:
+                log(f"WARN: Could not read the journal offset, replaying it all: {e}")
+
+    def size(self) -> int:
+        try:
+            return os.path.getsize(self.path)
+        except OSError:
+            return 0
+
+    def pending(self) -> int:
+        """Bytes not uploaded yet."""
+        return max(0, self.size() - self.offset)
+
+    def append(self, records: list[Record]) -> None:
+        if not records:
+            return
+        with self._lock, open(self.path, "a") as file:
+            file.writelines(json.dumps(record) + "\n" for record in records)
+            file.flush()
+            os.fsync(file.fileno())
+
+    def read(self, max_records: int, max_bytes: int) -> tuple[list[Record], int]:
+        """Reads the oldest pending records.
+
+        Returns:
+            The records, and the offset to commit once they are uploaded.
+        """
+        records: list[Record] = []
+        offset = self.offset
+        if not self.pending():
+            return records, offset
+        with self._lock, open(self.path, "rb") as file:
+            file.seek(offset)
+            for line in file:
+                if not line.endswith(b"\n"):
+                    # partially written by a crash, the rest is lost
+                    break
+                if records and offset + len(line) - self.offset > max_bytes:
+                    break
+                offset += len(line)
+                try:
+                    records.append(json.loads(line))
+                except ValueError:
+                    log("WARN: Skipping a corrupted record of the upload journal")
+                if len(records) >= max_records:
+                    break
+        return records, offset
+
+    def commit(self, offset: int) -> None:
+        with self._lock:
+            if offset >= self.size():
+                # everything was uploaded, start over with an empty journal
+                open(self.path, "w").close()
+                offset = 0
+            self.offset = offset
+            tmp_path = f"{self.offset_path}.tmp"
+            with open(tmp_path, "w") as file:
+                file.write(str(offset))
+            os.replace(tmp_path, self.offset_path)
+
+
+class DataUploader:
+    """Uploads validation data in the background.
+
+    Records wait in a queue of at most `max_queue` records, and are sent in
+    batches of at most `batch_records` records and roughly `batch_bytes`
+    bytes, so data from several cycles shares one upload. When the queue is
+    full, or an upload fails, records are spilled to an `UploadJournal`.
+    The journal is replayed before newer records, on restart as well.
+
+    After a failed upload, the next one waits for an exponential backoff
+    with jitter, up to `max_backoff` seconds. Only `run` waits on uploads,
+    `submit` at most on a spill to the journal, which like every journal
+    access runs in a worker thread.
+    """
+
+    def __init__(
+        self,
+        client: ModuleClient,
+        target_key: Ss58Address,
+        journal_path: str,
+        max_queue: int = 5000,
+        batch_records: int = 500,
+        batch_bytes: int = 4_000_000,
+        flush_interval: float = 60,
+        timeout: int = 60,
+        max_backoff: float = 1800,
+    ) -> None:
+        self.client = client
+        self.target_key = target_key
+        self.journal = UploadJournal(journal_path)
+        self.max_queue = max_queue
+        self.batch_records = batch_records
+        self.batch_bytes = batch_bytes
+        self.flush_interval = flush_interval
+        self.timeout = timeout
+        self.max_backoff = max_backoff
+        self._queue: deque[Record] = deque()
+        # records at the front of the queue being uploaded
+        self._in_flight = 0
+        self._failures = 0
+        self._next_attempt = 0.0
+        self._stopped = False
+        self.uploaded = 0
+        self.spilled = 0
+        self.failed_uploads = 0
+
+    @classmethod
+    def from_settings(
+        cls,
+        client: ModuleClient,
+        target_key: Ss58Address,
+        settings: ValidatorSettings,
+        timeout: int = 60,
+    ) -> "DataUploader":
+        return cls(
+            client,
+            target_key,
+            settings.upload_journal_path,
+            max_queue=settings.upload_queue_size,
+            batch_records=settings.upload_batch_size,
+            batch_bytes=settings.upload_batch_bytes,
+            flush_interval=settings.upload_interval,
+            timeout=timeout,
+            max_backoff=settings.upload_max_backoff,
+        )
+
+    async def submit(self, records: list[Record]) -> None:
+        """Queues records for upload, spilling what doesn't fit to disk."""
+        room = max(0, self.max_queue - len(self._queue))
+        self._queue.extend(records[:room])
+        if len(records) > room:
+            await self._spill(records[room:])
+
+    async def _spill(self, records: list[Record]) -> None:
+        self.spilled += len(records)
+        await asyncio.to_thread(self.journal.append, records)
+
+    def _drop(self, amount: int) -> None:
+        for _ in range(min(amount, len(self._queue))):
+            self._queue.popleft()
+
+    async def _next_batch(self) -> tuple[list[Record], int | None]:
+        """The journal goes first, as it holds the oldest records.
+
+        Returns:
+            The batch, and the journal offset to commit, or None if the
+            batch comes from the queue.
+        """
+        records, offset = await asyncio.to_thread(
+            self.journal.read, self.batch_records, self.batch_bytes
+        )
+        if records or offset != self.journal.offset:
+            return records, offset
+        batch: list[Record] = []
+        size = 0
+        for record in self._queue:
+            size += len(json.dumps(record))
+            if batch and (len(batch) >= self.batch_records or size > self.batch_bytes):
+                break
+            batch.append(record)
+        return batch, None
+
+    async def flush(self) -> None:
+        """Uploads batches until everything is uploaded or an upload fails."""
+        while time.time() >= self._next_attempt:
+            batch, offset = await self._next_batch()
+            if offset is not None and not batch:
+                # nothing but corrupted lines
+                await asyncio.to_thread(self.journal.commit, offset)
+                continue
+            if not batch:
+                return
+            if offset is None:
+                self._in_flight = len(batch)
+            try:
+                await self.client.call(
+                    "upload_to_hugging_face",
+                    self.target_key,
+                    {"data_list": batch},
+                    timeout=self.timeout,
+                )
+            except asyncio.CancelledError:
+                self._in_flight = 0
+                if self._stopped:
+                    # `stop` left these records to the cancelled upload
+                    self.stop()
+                raise
+            except Exception as e:
+                self._in_flight = 0
+                self._failures += 1
+                self.failed_uploads += 1
+                backoff = min(2 ** self._failures, self.max_backoff) * random.uniform(0.5, 1)
+                self._next_attempt = time.time() + backoff
+                log(f"Upload of {len(batch)} records failed, retrying in {backoff:.0f}s: {e}")
+                if offset is None:
+                    # on disk they survive a restart, and free the queue
+                    self._drop(len(batch))
+                    await self._spill(batch)
+                return
+            self._in_flight = 0
+            self._failures = 0
+            self.uploaded += len(batch)
+            if offset is None:
+                self._drop(len(batch))
+            else:
+                await asyncio.to_thread(self.journal.commit, offset)
+            log(f"Uploaded {len(batch)} records")
+
+    async def run(self) -> None:
+        """Uploads every `flush_interval` seconds until stopped."""
+        while not self._stopped:
+            try:
+                await self.flush()
+            except Exception as e:
+                log(f"WARN: Uploader error: {e}")
+            await asyncio.sleep(self.flush_interval)
+
+    def stop(self) -> None:
+        """Spills the queued records to disk, so the next run uploads them.
+
+        Records of an upload still in flight are left to it: it drops them
+        once uploaded, or spills them if the upload fails.
+        """
+        self._stopped = True
+        records = list(self._queue)[self._in_flight:]
+        for _ in records:
+            self._queue.pop()
+        self.spilled += len(records)
+        self.journal.append(records)
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "queued": len(self._queue),
+            "journal_bytes": self.journal.pending(),
+            "uploaded": self.uploaded,
+            "spilled": self.spilled,
+            "failed_uploads": self.failed_uploads,
+        }
@@ -0,0 +1,173 @@
+import json
+import os
+from dataclasses import asdict, dataclass
+from typing import Any
+
+from ..utils import log
+from ._config import ValidatorSettings
+
+
+@dataclass
+class Vote:
+    uids: list[int]
+    weights: list[int]
+    # block the vote was submitted at
+    block: int
+
+
+class VoteTracker:
+    """Remembers the last submitted vote, to skip votes that barely change it.
+
+    A new vote is submitted only when one of these holds:
+    - The share of the total weight it moves, half the L1 distance between
+      the normalized vectors, is at least `min_change`.
+    - The `top_k` highest weighted uids changed.
+    - The last vote is `max_staleness` or more blocks old. When the subnet
+      expires weights sooner, the bound is `staleness_margin` blocks before
+      its max weight age.
+
+    Otherwise the vote is skipped. The last vote is persisted along with the
+    `netuid` and validator `key` it was cast by, so a restarted validator
+    doesn't vote again right away. A saved vote of another subnet or key is
+    ignored.
+    """
+
+    def __init__(
+        self,
+        path: str | None,
+        min_change: float = 0.05,
+        top_k: int = 10,
+        max_staleness: int = 2160,
+        staleness_margin: int = 400,
+        netuid: int | None = None,
+        key: str | None = None,
+    ) -> None:
+        self.path = os.path.expanduser(path) if path else None
+        self.min_change = min_change
+        self.top_k = top_k
+        self.max_staleness = max_staleness
+        self.staleness_margin = staleness_margin
+        self.netuid = netuid
+        self.key = key
+        self.last_vote: Vote | None = None
+        self.submitted = 0
+        self.skipped = 0
+        self.load()
+
+    @classmethod
+    def from_settings(
+        cls, settings: ValidatorSettings, netuid: int, key: str
+    ) -> "VoteTracker":
+        return cls(
+            settings.last_vote_path or None,
+            min_change=settings.vote_min_change,
+            top_k=settings.vote_top_k,
+            max_staleness=settings.vote_max_staleness,
+            staleness_margin=settings.vote_staleness_margin,
+            netuid=netuid,
+            key=key,
+        )
+
+    def staleness(self, max_weight_age: int | None = None) -> int:
+        """Blocks after which the last vote is submitted again regardless."""
+        if max_weight_age is None:
+            return self.max_staleness
+        return min(self.max_staleness, max_weight_age - self.staleness_margin)
+
+    def change(self, uids: list[int], weights: list[int]) -> float:
+        """Share of the total weight moved since the last vote, from 0 to 1."""
+        assert self.last_vote is not None
+        old = _normalized(self.last_vote.uids, self.last_vote.weights)
+        new = _normalized(uids, weights)
+        return sum(abs(new.get(uid, 0) - old.get(uid, 0)) for uid in old.keys() | new.keys()) / 2
+
+    def top_changed(self, uids: list[int], weights: list[int]) -> bool:
+        assert self.last_vote is not None
+        return _top(self.last_vote.uids, self.last_vote.weights, self.top_k) != _top(
+            uids, weights, self.top_k
+        )
+
+    def should_submit(
+        self,
+        uids: list[int],
+        weights: list[int],
+        block: int,
+        max_weight_age: int | None = None,
+    ) -> bool:
+        """Whether to submit a vote, counting it as skipped if not.
+
+        Args:
+            max_weight_age: Blocks after which the subnet expires weights.
+        """
+        if self.last_vote is None:
+            reason = "no previous vote"
+        elif block - self.last_vote.block >= self.staleness(max_weight_age):
+            reason = f"last vote is {block - self.last_vote.block} blocks old"
+        elif (change := self.change(uids, weights)) >= self.min_change:
+            reason = f"{change:.1%} of the weight moved"
+        elif self.top_k and self.top_changed(uids, weights):
+            reason = f"the top {self.top_k} uids changed"
+        else:
+            self.skipped += 1
+            log(
+                f"Skipping the vote, only {change:.1%} of the weight moved since "
+                f"block {self.last_vote.block}"
+            )
+            return False
+        log(f"Submitting the vote, {reason}")
+        return True
+
+    def record(self, uids: list[int], weights: list[int], block: int) -> None:
+        """Saves a vote that was submitted."""
+        self.submitted += 1
+        self.last_vote = Vote(list(uids), list(weights), block)
+        self.save()
+
+    def stats(self) -> dict[str, int | None]:
+        return {
+            "submitted": self.submitted,
+            "skipped": self.skipped,
+            "last_vote_block": self.last_vote.block if self.last_vote else None,
+        }
+
+    def load(self) -> None:
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path) as file:
+                record: dict[str, Any] = json.load(file)
+            netuid, key = record["netuid"], record["key"]
+            vote = Vote(**record["vote"])
+        except (OSError, ValueError, TypeError, KeyError) as e:
+            log(f"WARN: Could not load the last vote from {self.path}: {e}")
+            return
+        if (netuid, key) != (self.netuid, self.key):
+            log(f"Ignoring the last vote of key {key} in subnet {netuid}")
+            return
+        self.last_vote = vote
+
+    def save(self) -> None:
+        if not self.path or self.last_vote is None:
+            return
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        record = {
+            "netuid": self.netuid,
+            "key": self.key,
+            "vote": asdict(self.last_vote),
+        }
+        with open(tmp_path, "w") as file:
+            json.dump(record, file)
+        os.replace(tmp_path, self.path)
+
+
+def _normalized(uids: list[int], weights: list[int]) -> dict[int, float]:
+    total = sum(weights)
+    if not total:
+        return {}
+    return {uid: weight / total for uid, weight in zip(uids, weights)}
+
+
+def _top(uids: list[int], weights: list[int], k: int) -> set[int]:
+    ranked = sorted(zip(uids, weights), key=lambda x: x[1], reverse=True)
+    return {uid for uid, _ in ranked[:k]}
@@ -0,0 +1,79 @@
+import numpy as np
+from numpy.typing import NDArray
+
+from .sigmoid import threshold_sigmoid_rewards
+
+# sum of the integer weights of a vote
+WEIGHT_SCALE = 1000
+
+
+def top_k(
+    uids: NDArray[np.int64], scores: NDArray[np.float64], k: int
+) -> tuple[NDArray[np.int64], NDArray[np.float64]]:
+    """Keeps the `k` highest scores, highest first.
+
+    Equal scores keep their input order, and ties at the cut are broken in
+    favor of the earlier uids, same as a stable descending sort.
+    """
+    if k <= 0:
+        return uids[:0], scores[:0]
+    if k < len(scores):
+        # the k-th highest score, found without sorting everything
+        kth = scores[np.argpartition(-scores, k - 1)[k - 1]]
+        above = np.flatnonzero(scores > kth)
+        tied = np.flatnonzero(scores == kth)[:k - len(above)]
+        selected = np.sort(np.concatenate([above, tied]))
+    else:
+        selected = np.arange(len(scores))
+    order = selected[np.argsort(-scores[selected], kind="stable")]
+    return uids[order], scores[order]
+
+
+def normalize_weights(
+    rewards: NDArray[np.float64],
+    scale: int = WEIGHT_SCALE,
+    largest_remainder: bool = False,
+) -> NDArray[np.int64]:
+    """Turns rewards into integer weights proportional to them.
+
+    Each weight is rounded down, so the weights may add up to less than
+    `scale`. Opting in to `largest_remainder` gives the units lost to
+    rounding to the weights with the largest fractional parts (earlier ones
+    first on ties), so they add up to exactly `scale`.
+    """
+    # summed in Python, like `threshold_sigmoid_rewards` does
+    exact = rewards * scale / sum(rewards.tolist())
+    weights = exact.astype(np.int64)
+    if largest_remainder:
+        missing = scale - int(weights.sum())
+        if missing > 0:
+            remainders = exact - weights
+            weights[np.argsort(-remainders, kind="stable")[:missing]] += 1
+    return weights
+
+
+def compute_weights(
+    score_dict: dict[int, float],
+    max_allowed_weights: int,
+    largest_remainder: bool = False,
+) -> tuple[list[int], list[int]]:
+    """Computes the vote of a validator from the scores of the miners.
+
+    Keeps the `max_allowed_weights` best miners, spreads their scores with
+    a threshold sigmoid and normalizes them into integer weights.
+
+    Returns:
+        The uids and weights of the vote, without the uids whose weight is 0.
+    """
+    if not score_dict:
+        return [], []
+    uids = np.fromiter(score_dict.keys(), dtype=np.int64, count=len(score_dict))
+    scores = np.fromiter(score_dict.values(), dtype=np.float64, count=len(score_dict))
+    uids, scores = top_k(uids, scores, max_allowed_weights)
+    if not len(scores):
+        return [], []
+    weights = normalize_weights(
+        threshold_sigmoid_rewards(scores), largest_remainder=largest_remainder
+    )
+    nonzero = weights != 0
+    return uids[nonzero].tolist(), weights[nonzero].tolist()